@@ -8,14 +8,29 @@ Telegram Channel Users Scanner and Cleaner
 __version__ = "0.1.0"
 __author__ = "Telegram Scanner Team"
 
-from .main import TelegramScannerApp
+import importlib
+from typing import Any
+
+# Конфигурация ленивая и легкая, импортируем сразу: имя config совпадает
+# с именем подмодуля и должно указывать на объект конфигурации
 from .config import config
-from .database import DatabaseManager, User
-from .exporter import TelegramExporter
-from .analyzer import DeletedUserAnalyzer, DeletionCandidate, DeletionReason
-from .deleter import TelegramUserDeleter
-from .reporter import ReportGenerator
-from .checkpoint_manager import CheckpointManager, Checkpoint
+
+# Публичные имена и модули, из которых они берутся. Подмодули (telethon, pandas и т.д.)
+# импортируются только при первом обращении к имени
+_EXPORTS = {
+    "TelegramScannerApp": ".main",
+    "DatabaseManager": ".database",
+    "User": ".database",
+    "TelegramExporter": ".exporter",
+    "DeletedUserAnalyzer": ".analyzer",
+    "DeletionCandidate": ".analyzer",
+    "DeletionReason": ".analyzer",
+    "CandidateBatch": ".analyzer",
+    "TelegramUserDeleter": ".deleter",
+    "ReportGenerator": ".reporter",
+    "CheckpointManager": ".checkpoint_manager",
+    "Checkpoint": ".checkpoint_manager",
+}
 
 __all__ = [
     "TelegramScannerApp",
@@ -26,8 +41,22 @@ __all__ = [
     "DeletedUserAnalyzer",
     "DeletionCandidate",
     "DeletionReason",
+    "CandidateBatch",
     "TelegramUserDeleter",
     "ReportGenerator",
     "CheckpointManager",
     "Checkpoint",
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    """Импортировать публичное имя из подмодуля при первом обращении"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
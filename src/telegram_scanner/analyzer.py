@@ -1,12 +1,73 @@
 import re
-from typing import List, Dict, Set, Tuple
+import sys
+from typing import List, Dict, Set, Tuple, Optional, Any, AsyncIterator
+from collections import Counter
 from dataclasses import dataclass
-from enum import Enum
+from enum import Enum, IntFlag
 from datetime import datetime
+import numpy as np
 
 from .database import DatabaseManager
 
 
+_DELETED_PATTERNS = (
+    r'deleted\s+account',
+    r'deleted\s+user',
+    r'^deleted\s*$',
+    r'account\s+deleted',
+    r'user\s+deleted'
+)
+
+_FAKE_PATTERNS = (
+    r'^user\d+$',
+    r'^\d+$',
+    r'^user_\d+$',
+    r'^telegram_\d+$',
+    r'^anonymous\d*$',
+    r'^user$',
+    r'^profile$',
+    r'^account$'
+)
+
+_SUSPICIOUS_PATTERNS = (
+    r'^user\d+',
+    r'^\d{5,}$',
+    r'^[a-z]{1,2}\d+$',
+    r'^_\w+$',
+    r'^\w+_$'
+)
+
+
+def _combine_patterns(patterns: Tuple[str, ...], prefix: str) -> Tuple[re.Pattern, Dict[str, int]]:
+    """Собрать паттерны в одну альтернацию с именованными группами (имя группы -> индекс правила)"""
+    groups = {f"{prefix}{i}": i for i in range(len(patterns))}
+    combined = re.compile("|".join(f"(?P<{name}>{patterns[i]})" for name, i in groups.items()))
+    return combined, groups
+
+
+# Паттерны компилируются один раз при загрузке модуля. Альтернация находит
+# самое левое совпадение, а приоритет у правил - по порядку в списке, поэтому
+# после m.lastgroup проверяются только правила с меньшим индексом
+_DELETED_RE, _DELETED_GROUPS = _combine_patterns(_DELETED_PATTERNS, "deleted")
+_DELETED_RULES = tuple(re.compile(pattern) for pattern in _DELETED_PATTERNS)
+
+# Из паттернов подозрительных username регулярка нужна только для ^[a-z]{1,2}\d+$,
+# остальные проверяются строковыми методами в _is_suspicious_username
+_SHORT_PREFIX_DIGITS_RE = re.compile(_SUSPICIOUS_PATTERNS[2])
+
+# Точные совпадения "имя фамилия", которые проверяются без регулярных выражений.
+# Значение - паттерн, который сработал бы для этой строки
+_EXACT_DELETED = {
+    "deleted ": _DELETED_PATTERNS[2],
+    "deleted account": _DELETED_PATTERNS[0],
+    "deleted user": _DELETED_PATTERNS[1],
+    "account deleted": _DELETED_PATTERNS[3],
+    "user deleted": _DELETED_PATTERNS[4],
+}
+
+_DEFAULT_NAMES = frozenset({'user', 'account', 'profile', 'anonymous', 'telegram'})
+
+
 class DeletionReason(Enum):
     """Причины для удаления пользователя"""
     DELETED_ACCOUNT = "Deleted Account"
@@ -18,6 +79,21 @@ class DeletionReason(Enum):
     EMPTY_PROFILE = "Empty Profile"
 
 
+class DetailsFlag(IntFlag):
+    """Признаки кандидата, упакованные в битовую маску вместо словаря details"""
+    HAS_USERNAME = 1
+    IS_BOT = 2
+    SUSPICIOUS_USERNAME = 4
+    EMPTY_PROFILE = 8
+
+
+# Пояснения, общие для всех кандидатов (одна строка на паттерн, а не на пользователя)
+_EMPTY_PROFILE_AS_DELETED = sys.intern('empty_profile_as_deleted')
+_SUSPICIOUS_REASONS = {
+    pattern: sys.intern(f"Matches pattern: {pattern}") for pattern in _SUSPICIOUS_PATTERNS
+}
+
+
 @dataclass
 class DeletionCandidate:
     """Кандидат на удаление"""
@@ -28,7 +104,142 @@ class DeletionCandidate:
     last_name: str
     reason: DeletionReason
     confidence: float  # Уверенность в правильности решения (0-1)
-    details: Dict
+    details: DetailsFlag = DetailsFlag(0)
+    pattern: Optional[str] = None  # Сработавший паттерн или пояснение к причине
+
+    @property
+    def is_bot(self) -> bool:
+        return bool(self.details & DetailsFlag.IS_BOT)
+
+    @property
+    def details_dict(self) -> Dict[str, Any]:
+        """Подробности в виде словаря (создается по требованию, например для отчетов)"""
+        if self.details & DetailsFlag.SUSPICIOUS_USERNAME:
+            return {'suspicious_username': True, 'reason': self.pattern}
+        if self.details & DetailsFlag.EMPTY_PROFILE:
+            return {'empty_profile': True, 'reason': self.pattern}
+        return {
+            'pattern_matched': self.pattern,
+            'has_username': bool(self.details & DetailsFlag.HAS_USERNAME),
+            'bot': self.is_bot
+        }
+
+
+def _is_word(value: str) -> bool:
+    """Аналог ^\w+$: только буквы, цифры и подчеркивания"""
+    return value.replace('_', 'a').isalnum()
+
+
+_HAS_USERNAME = int(DetailsFlag.HAS_USERNAME)
+_IS_BOT = int(DetailsFlag.IS_BOT)
+
+
+def _deleted_details_code(user: Dict, pattern: str) -> int:
+    """Флаги удаленного аккаунта целым числом (общие для списка и CandidateBatch)"""
+    code = 0
+    # У пустого профиля username пустой или из одних пробелов - флаг не ставится
+    if user['username'] and pattern is not _EMPTY_PROFILE_AS_DELETED:
+        code = _HAS_USERNAME
+    if user.get('bot', False):
+        code |= _IS_BOT
+    return code
+
+
+def _deleted_details(user: Dict, pattern: str) -> DetailsFlag:
+    """Флаги для кандидата - удаленного аккаунта"""
+    return DetailsFlag(_deleted_details_code(user, pattern))
+
+
+# Коды причин для колоночного хранения: индекс в порядке объявления DeletionReason
+_REASONS = tuple(DeletionReason)
+_REASON_CODES = {reason: code for code, reason in enumerate(_REASONS)}
+
+
+@dataclass
+class CandidateBatch:
+    """Кандидаты на удаление в колоночном виде: по массиву на каждое поле"""
+    user_ids: np.ndarray        # int64
+    access_hashes: np.ndarray   # int64
+    reason_codes: np.ndarray    # int8, индекс в DeletionReason
+    confidence: np.ndarray      # float64
+    usernames: List[Optional[str]]
+    first_names: List[Optional[str]]
+    last_names: List[Optional[str]]
+    patterns: List[str]
+    details: np.ndarray         # uint8, флаги DetailsFlag
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @classmethod
+    def empty(cls) -> 'CandidateBatch':
+        """Пустой набор кандидатов"""
+        return cls(
+            user_ids=np.empty(0, dtype=np.int64),
+            access_hashes=np.empty(0, dtype=np.int64),
+            reason_codes=np.empty(0, dtype=np.int8),
+            confidence=np.empty(0, dtype=np.float64),
+            usernames=[], first_names=[], last_names=[], patterns=[],
+            details=np.empty(0, dtype=np.uint8)
+        )
+
+    @classmethod
+    def concat(cls, batches: List['CandidateBatch']) -> 'CandidateBatch':
+        """Объединить несколько наборов в один"""
+        if not batches:
+            return cls.empty()
+        return cls(
+            user_ids=np.concatenate([b.user_ids for b in batches]),
+            access_hashes=np.concatenate([b.access_hashes for b in batches]),
+            reason_codes=np.concatenate([b.reason_codes for b in batches]),
+            confidence=np.concatenate([b.confidence for b in batches]),
+            usernames=[v for b in batches for v in b.usernames],
+            first_names=[v for b in batches for v in b.first_names],
+            last_names=[v for b in batches for v in b.last_names],
+            patterns=[v for b in batches for v in b.patterns],
+            details=np.concatenate([b.details for b in batches])
+        )
+
+    def take(self, mask: np.ndarray) -> 'CandidateBatch':
+        """Выбрать кандидатов по булевой маске"""
+        indices = np.flatnonzero(mask)
+        return CandidateBatch(
+            user_ids=self.user_ids[indices],
+            access_hashes=self.access_hashes[indices],
+            reason_codes=self.reason_codes[indices],
+            confidence=self.confidence[indices],
+            usernames=[self.usernames[i] for i in indices],
+            first_names=[self.first_names[i] for i in indices],
+            last_names=[self.last_names[i] for i in indices],
+            patterns=[self.patterns[i] for i in indices],
+            details=self.details[indices]
+        )
+
+    def filter_by_confidence(self, min_confidence: float = 0.8) -> 'CandidateBatch':
+        """Отфильтровать кандидатов по минимальной уверенности"""
+        return self.take(self.confidence >= min_confidence)
+
+    def count_by_reason(self) -> Dict[str, int]:
+        """Количество кандидатов по причинам удаления"""
+        counts = np.bincount(self.reason_codes, minlength=len(_REASONS))
+        return {_REASONS[code].value: int(count) for code, count in enumerate(counts) if count}
+
+    def to_candidates(self) -> List[DeletionCandidate]:
+        """Развернуть в список DeletionCandidate (для отчетов и удаления)"""
+        return [
+            DeletionCandidate(
+                user_id=int(self.user_ids[i]),
+                access_hash=int(self.access_hashes[i]),
+                username=self.usernames[i],
+                first_name=self.first_names[i],
+                last_name=self.last_names[i],
+                reason=_REASONS[self.reason_codes[i]],
+                confidence=float(self.confidence[i]),
+                details=DetailsFlag(int(self.details[i])),
+                pattern=self.patterns[i]
+            )
+            for i in range(len(self))
+        ]
 
 
 class DeletedUserAnalyzer:
@@ -36,32 +247,9 @@ class DeletedUserAnalyzer:
 
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
-        self.deleted_patterns = [
-            r'deleted\s+account',
-            r'deleted\s+user',
-            r'^deleted\s*$',
-            r'account\s+deleted',
-            r'user\s+deleted'
-        ]
-
-        self.fake_patterns = [
-            r'^user\d+$',
-            r'^\d+$',
-            r'^user_\d+$',
-            r'^telegram_\d+$',
-            r'^anonymous\d*$',
-            r'^user$',
-            r'^profile$',
-            r'^account$'
-        ]
-
-        self.suspicious_usernames = [
-            r'^user\d+',
-            r'^\d{5,}$',
-            r'^[a-z]{1,2}\d+$',
-            r'^_\w+$',
-            r'^\w+_$'
-        ]
+        self.deleted_patterns = _DELETED_PATTERNS
+        self.fake_patterns = _FAKE_PATTERNS
+        self.suspicious_usernames = _SUSPICIOUS_PATTERNS
 
     async def find_deleted_accounts(
         self,
@@ -78,70 +266,138 @@ class DeletedUserAnalyzer:
         Returns:
             Список кандидатов на удаление
         """
-        candidates = []
+        return [candidate async for candidate in self.iter_deleted_accounts(channel_id)]
 
-        # Получаем всех пользователей из базы
-        deleted_users = await self.db.find_deleted_accounts(limit=None, channel_id=channel_id)
+    async def iter_deleted_accounts(self, channel_id: int = None) -> AsyncIterator[DeletionCandidate]:
+        """Потоково выдавать кандидатов на удаление по мере чтения из БД"""
+        async for batch in self.iter_deleted_batches(channel_id):
+            for candidate in batch.to_candidates():
+                yield candidate
 
-        for user in deleted_users:
-            candidate = self._analyze_deleted_account(user)
-            if candidate:
-                candidates.append(candidate)
+    async def find_deleted_accounts_batch(self, channel_id: int = None) -> CandidateBatch:
+        """
+        Найти удаленные аккаунты в колоночном виде, без создания объекта на каждого кандидата
 
-        return candidates
+        Args:
+            channel_id: ID канала для фильтрации
 
-    def _analyze_deleted_account(self, user: Dict) -> DeletionCandidate:
-        """Анализ одного пользователя на предмет удаленного аккаунта"""
+        Returns:
+            Набор кандидатов CandidateBatch
+        """
+        return CandidateBatch.concat([batch async for batch in self.iter_deleted_batches(channel_id)])
+
+    async def iter_deleted_batches(self, channel_id: int = None) -> AsyncIterator[CandidateBatch]:
+        """Потоково выдавать кандидатов пачками по мере чтения из БД"""
+        async for rows in self.db.iter_deleted_accounts(channel_id=channel_id):
+            batch = self._build_deleted_batch(rows)
+            if len(batch):
+                yield batch
+
+    def _build_deleted_batch(self, deleted_users: List[Dict]) -> CandidateBatch:
+        """Классифицировать пачку строк из БД за один проход, сразу в колоночный вид"""
+        if not deleted_users:
+            return CandidateBatch.empty()
+
+        selected, confidence, patterns, details = [], [], [], []
+        deleted_match = self._deleted_match
+        for user in deleted_users:
+            match = deleted_match(user)
+            if match is not None:
+                selected.append(user)
+                patterns.append(match[0])
+                confidence.append(match[1])
+                details.append(_deleted_details_code(user, match[0]))
+
+        count = len(selected)
+        return CandidateBatch(
+            user_ids=np.fromiter((user['id'] for user in selected), dtype=np.int64, count=count),
+            access_hashes=np.fromiter((user['access_hash'] for user in selected), dtype=np.int64, count=count),
+            reason_codes=np.full(count, _REASON_CODES[DeletionReason.DELETED_ACCOUNT], dtype=np.int8),
+            confidence=np.array(confidence, dtype=np.float64),
+            usernames=[user['username'] for user in selected],
+            first_names=[user['first_name'] for user in selected],
+            last_names=[user['last_name'] for user in selected],
+            patterns=patterns,
+            details=np.array(details, dtype=np.uint8)
+        )
+
+    @staticmethod
+    def _match_deleted_pattern(full_name: str) -> Optional[str]:
+        """Найти паттерн удаленного аккаунта для строки "имя фамилия" """
+        # Сначала точные совпадения, затем общая регулярка для остальных вариантов
+        pattern = _EXACT_DELETED.get(full_name)
+        if pattern is None:
+            match = _DELETED_RE.search(full_name)
+            if match:
+                index = _DELETED_GROUPS[match.lastgroup]
+                index = next((i for i in range(index) if _DELETED_RULES[i].search(full_name)), index)
+                pattern = _DELETED_PATTERNS[index]
+        return pattern
+
+    @classmethod
+    def _deleted_match(cls, user: Dict) -> Optional[Tuple[str, float]]:
+        """Паттерн и уверенность, если пользователь похож на удаленный аккаунт, иначе None"""
+        # Случай полностью пустого профиля (часто означает удаленный аккаунт):
+        # проверяется по исходным значениям, до нормализации строк
+        if not user.get('first_name') and not user.get('last_name') and not user.get('username'):
+            return _EMPTY_PROFILE_AS_DELETED, 0.85
 
         first_name = (user.get('first_name') or '').lower().strip()
         last_name = (user.get('last_name') or '').lower().strip()
         username = (user.get('username') or '').lower().strip()
 
-        # Случай полностью пустого профиля (часто означает удаленный аккаунт)
+        # Поля из одних пробелов тоже считаются пустым профилем
         if not first_name and not last_name and not username:
-            return DeletionCandidate(
-                user_id=user['id'],
-                access_hash=user['access_hash'],
-                username=user['username'],
-                first_name=user['first_name'],
-                last_name=user['last_name'],
-                reason=DeletionReason.DELETED_ACCOUNT,
-                confidence=0.85,
-                details={
-                    'pattern_matched': 'empty_profile_as_deleted',
-                    'has_username': False,
-                    'bot': user.get('bot', False)
-                }
-            )
+            return _EMPTY_PROFILE_AS_DELETED, 0.85
 
         # Проверяем паттерны удаленных аккаунтов
-        for pattern in self.deleted_patterns:
-            if re.search(pattern, f"{first_name} {last_name}"):
-                reason = DeletionReason.DELETED_ACCOUNT
-                confidence = 0.95
-
-                # Дополнительная проверка на отсутствие username
-                if not username:
-                    confidence = 0.99
-                elif username in ['deleted', 'account', 'user', '']:
-                    confidence = 0.98
-
-                return DeletionCandidate(
-                    user_id=user['id'],
-                    access_hash=user['access_hash'],
-                    username=user['username'],
-                    first_name=user['first_name'],
-                    last_name=user['last_name'],
-                    reason=reason,
-                    confidence=confidence,
-                    details={
-                        'pattern_matched': pattern,
-                        'has_username': bool(user['username']),
-                        'bot': user.get('bot', False)
-                    }
-                )
-
-        return None
+        pattern = cls._match_deleted_pattern(f"{first_name} {last_name}")
+        if pattern is None:
+            return None
+
+        # Дополнительная проверка на отсутствие username
+        if not username:
+            return pattern, 0.99
+        if username in ('deleted', 'account', 'user'):
+            return pattern, 0.98
+        return pattern, 0.95
+
+    def _analyze_deleted_account(self, user: Dict) -> DeletionCandidate:
+        """Анализ одного пользователя на предмет удаленного аккаунта"""
+        match = self._deleted_match(user)
+        if match is None:
+            return None
+
+        pattern, confidence = match
+        if pattern is _EMPTY_PROFILE_AS_DELETED:
+            return self._empty_profile_candidate(user)
+
+        return DeletionCandidate(
+            user_id=user['id'],
+            access_hash=user['access_hash'],
+            username=user['username'],
+            first_name=user['first_name'],
+            last_name=user['last_name'],
+            reason=DeletionReason.DELETED_ACCOUNT,
+            confidence=confidence,
+            details=_deleted_details(user, pattern),
+            pattern=pattern
+        )
+
+    @staticmethod
+    def _empty_profile_candidate(user: Dict) -> DeletionCandidate:
+        """Кандидат для профиля без имени, фамилии и username"""
+        return DeletionCandidate(
+            user_id=user['id'],
+            access_hash=user['access_hash'],
+            username=user['username'],
+            first_name=user['first_name'],
+            last_name=user['last_name'],
+            reason=DeletionReason.DELETED_ACCOUNT,
+            confidence=0.85,
+            details=_deleted_details(user, _EMPTY_PROFILE_AS_DELETED),
+            pattern=_EMPTY_PROFILE_AS_DELETED
+        )
 
     async def find_suspicious_accounts(
         self,
@@ -172,59 +428,73 @@ class DeletedUserAnalyzer:
 
         username = username.lower()
 
-        for pattern in self.suspicious_usernames:
-            if re.search(pattern, username):
-                return True, f"Matches pattern: {pattern}", 0.6
+        # Проверки идут в порядке _SUSPICIOUS_PATTERNS
+        if username.startswith('user') and username[4:5].isdecimal():
+            pattern = _SUSPICIOUS_PATTERNS[0]       # ^user\d+
+        elif len(username) >= 5 and username.isdecimal():
+            pattern = _SUSPICIOUS_PATTERNS[1]       # ^\d{5,}$
+        elif _SHORT_PREFIX_DIGITS_RE.search(username):
+            pattern = _SUSPICIOUS_PATTERNS[2]       # ^[a-z]{1,2}\d+$
+        elif len(username) > 1 and _is_word(username) and username[0] == '_':
+            pattern = _SUSPICIOUS_PATTERNS[3]       # ^_\w+$
+        elif len(username) > 1 and _is_word(username) and username[-1] == '_':
+            pattern = _SUSPICIOUS_PATTERNS[4]       # ^\w+_$
+        else:
+            return False, "", 0.0
 
-        return False, "", 0.0
+        return True, _SUSPICIOUS_REASONS[pattern], 0.6
 
     def _has_default_profile(self, user: Dict) -> Tuple[bool, str, float]:
         """Проверить на дефолтный профиль"""
-        first_name = user.get('first_name', '').strip()
-        last_name = user.get('last_name', '').strip()
-        username = user.get('username', '').strip()
-
-        issues = []
-        confidence = 0.0
+        # Поля из БД могут быть None, поэтому не полагаемся на default в get()
+        first_name = (user.get('first_name') or '').strip()
+        last_name = (user.get('last_name') or '').strip()
+        username = (user.get('username') or '').strip()
 
         # Нет имени пользователя
         if not first_name and not last_name and not username:
             return True, "Empty profile", 0.9
 
-        # Имена по умолчанию
-        default_names = ['user', 'account', 'profile', 'anonymous', 'telegram']
-        if first_name.lower() in default_names:
-            issues.append(f"Default first name: {first_name}")
-            confidence += 0.3
+        # Имена по умолчанию: только имя дает 0.3, вместе с фамилией 0.5
+        default_first = first_name.lower() in _DEFAULT_NAMES
+        default_last = last_name.lower() in _DEFAULT_NAMES
+        confidence = 0.3 * default_first + 0.2 * default_last
 
-        if last_name and last_name.lower() in default_names:
-            issues.append(f"Default last name: {last_name}")
-            confidence += 0.2
-
-        if confidence >= min(0.5, 0.5):
-            return True, "; ".join(issues), min(confidence, 0.8)
+        if confidence < 0.5:
+            return False, "", 0.0
 
-        return False, "", 0.0
+        issues = []
+        if default_first:
+            issues.append(f"Default first name: {first_name}")
+        if default_last:
+            issues.append(f"Default last name: {last_name}")
+        return True, "; ".join(issues), min(confidence, 0.8)
 
     async def analyze_user_batch(self, users: List[Dict]) -> List[DeletionCandidate]:
         """Анализировать пакет пользователей"""
+        return self._classify_users(users)
+
+    def _classify_users(self, users: List[Dict]) -> List[DeletionCandidate]:
+        """Синхронная классификация пакета пользователей"""
         candidates = []
+        if not users:
+            return candidates
 
         for user in users:
-            # Проверка на удаленный аккаунт
+            # Проверка на удаленный аккаунт (регулярка проверяется один раз на строку)
             deleted = self._analyze_deleted_account(user)
             if deleted:
                 candidates.append(deleted)
                 continue
 
             # Проверка на другие признаки
-            suspicious = await self._check_suspicious_signs(user)
+            suspicious = self._check_suspicious_signs(user)
             if suspicious:
                 candidates.extend(suspicious)
 
         return candidates
 
-    async def _check_suspicious_signs(self, user: Dict) -> List[DeletionCandidate]:
+    def _check_suspicious_signs(self, user: Dict) -> List[DeletionCandidate]:
         """Проверить пользователя на другие подозрительные признаки"""
         candidates = []
 
@@ -239,7 +509,8 @@ class DeletedUserAnalyzer:
                 last_name=user['last_name'],
                 reason=DeletionReason.FAKE_PATTERN,
                 confidence=confidence,
-                details={'suspicious_username': True, 'reason': reason}
+                details=DetailsFlag.SUSPICIOUS_USERNAME,
+                pattern=reason
             ))
 
         # Проверка на пустой профиль
@@ -253,7 +524,8 @@ class DeletedUserAnalyzer:
                 last_name=user['last_name'],
                 reason=DeletionReason.EMPTY_PROFILE,
                 confidence=confidence,
-                details={'empty_profile': True, 'reason': reason}
+                details=DetailsFlag.EMPTY_PROFILE,
+                pattern=reason
             ))
 
         return candidates
@@ -274,25 +546,32 @@ class DeletedUserAnalyzer:
 
     async def get_analysis_report(self, channel_id: int = None) -> Dict:
         """Получить полный отчет анализа"""
-        deleted_accounts = await self.find_deleted_accounts(channel_id)
+        # Удаленные аккаунты считаем потоково, не держа всех кандидатов в памяти
+        deleted_total = 0
+        deleted_high_confidence = 0
+        deleted_by_reason = Counter()
+        async for batch in self.iter_deleted_batches(channel_id):
+            deleted_total += len(batch)
+            deleted_high_confidence += int(np.count_nonzero(batch.confidence >= 0.9))
+            deleted_by_reason.update(batch.count_by_reason())
+
         suspicious_accounts = await self.find_suspicious_accounts(channel_id)
 
-        grouped_deleted = self.group_by_reason(deleted_accounts)
         grouped_suspicious = self.group_by_reason(suspicious_accounts)
 
         report = {
             'timestamp': datetime.now().isoformat(),
             'channel_id': channel_id,
-            'total_candidates': len(deleted_accounts) + len(suspicious_accounts),
+            'total_candidates': deleted_total + len(suspicious_accounts),
             'deleted_accounts': {
-                'total': len(deleted_accounts),
-                'by_reason': {reason: len(candidates) for reason, candidates in grouped_deleted.items()}
+                'total': deleted_total,
+                'by_reason': dict(deleted_by_reason)
             },
             'suspicious_accounts': {
                 'total': len(suspicious_accounts),
                 'by_reason': {reason: len(candidates) for reason, candidates in grouped_suspicious.items()}
             },
-            'high_confidence_deleted': len([c for c in deleted_accounts if c.confidence >= 0.9]),
+            'high_confidence_deleted': deleted_high_confidence,
             'high_confidence_suspicious': len([c for c in suspicious_accounts if c.confidence >= 0.9])
         }
 
@@ -1,9 +1,83 @@
+import asyncio
+import hashlib
 import json
 import pickle
+import sqlite3
+from contextlib import closing
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
 from dataclasses import dataclass, asdict
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него используется стандартный json
+    orjson = None
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # pyarrow необязателен, без него пакеты данных сохраняются через pickle
+    pa = None
+
+# Признак файла Arrow IPC (Feather v2) и ключ метаданных с исходным типом данных
+_ARROW_MAGIC = b"ARROW1"
+_ARROW_KIND_KEY = b"telegram_scanner.kind"
+# Типы значений, которые Arrow возвращает из to_pylist без изменений
+_ARROW_SCALAR_TYPES = (bool, int, float, str, bytes)
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    """Сериализовать данные чекпоинта в JSON"""
+    if orjson is not None:
+        return orjson.dumps(data).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _loads(payload: str) -> Dict[str, Any]:
+    """Разобрать JSON данных чекпоинта"""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _records_fit_arrow(records: List[Dict]) -> bool:
+    """
+    Переживет ли список словарей Arrow без потерь
+
+    from_pylist берет схему из первой записи: лишние ключи других записей
+    теряются, недостающие становятся None, кортежи превращаются в списки,
+    а столбец из int и float - во float. Поэтому Arrow допускается только
+    для записей с одинаковыми ключами и одним скалярным типом в столбце.
+    """
+    keys = tuple(records[0])
+    column_types: Dict[str, type] = {}
+    for record in records:
+        if tuple(record) != keys:
+            return False
+        for key, value in record.items():
+            if value is None:
+                continue
+            value_type = type(value)
+            if value_type not in _ARROW_SCALAR_TYPES:
+                return False
+            if column_types.setdefault(key, value_type) is not value_type:
+                return False
+    return True
+
+
+def channel_key(channel_username: str) -> int:
+    """
+    Стабильный ключ канала для чекпоинтов
+
+    В отличие от встроенного hash() для строк, не зависит от PYTHONHASHSEED,
+    поэтому чекпоинт находится и после перезапуска процесса.
+    """
+    normalized = channel_username.strip().lstrip('@').lower().encode('utf-8')
+    digest = hashlib.blake2b(normalized, digest_size=8).digest()
+    # Знаковое 64-битное значение помещается в INTEGER SQLite
+    return int.from_bytes(digest, 'big', signed=True)
 
 
 @dataclass
@@ -28,11 +102,71 @@ class Checkpoint:
 class CheckpointManager:
     """Менеджер для сохранения и загрузки чекпоинтов"""
 
+    DB_FILENAME = "checkpoints.db"
+
     def __init__(self, checkpoints_dir: str = "checkpoints"):
+        # Каталог и журнал создаются при первом обращении, а не при создании
+        # менеджера: иначе любой TelegramUserDeleter оставлял бы checkpoints/
+        # в текущем каталоге
         self.checkpoints_dir = Path(checkpoints_dir)
+        self._storage_ready = False
+        self.db_path = self.checkpoints_dir / self.DB_FILENAME
+        # Кэш разобранных чекпоинтов и версия журнала, для которой он собран
+        self._cache: Optional[list] = None
+        self._cache_version: Optional[tuple] = None
+        # Чекпоинты, ожидающие асинхронной записи (последний на операцию), и задача записи
+        self._pending: Dict[Tuple[str, int], Checkpoint] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открыть соединение с журналом чекпоинтов (транзакции управляются явно)"""
+        if not self._storage_ready:
+            self._init_storage()
+        return sqlite3.connect(self.db_path, isolation_level=None)
+
+    def _init_storage(self):
+        """Создать каталог и таблицы журнала чекпоинтов"""
         self.checkpoints_dir.mkdir(exist_ok=True)
-
-    def save_checkpoint(self, checkpoint: Checkpoint) -> str:
+        with closing(sqlite3.connect(self.db_path, isolation_level=None)) as db:
+            # Журнал всех чекпоинтов (только добавление)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    operation_type TEXT NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_checkpoints_op_channel_ts
+                ON checkpoints(operation_type, channel_id, timestamp DESC)
+            """)
+
+            # Указатель на последний чекпоинт операции (аналог прежних latest_*.json)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS latest_checkpoints (
+                    operation_type TEXT NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    checkpoint_id INTEGER NOT NULL,
+                    PRIMARY KEY (operation_type, channel_id)
+                )
+            """)
+
+            # Указатель обновляется самим SQLite при вставке - данные чекпоинта
+            # сериализуются и записываются только один раз
+            db.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_checkpoints_latest
+                AFTER INSERT ON checkpoints
+                BEGIN
+                    INSERT INTO latest_checkpoints (operation_type, channel_id, checkpoint_id)
+                    VALUES (NEW.operation_type, NEW.channel_id, NEW.id)
+                    ON CONFLICT(operation_type, channel_id) DO UPDATE SET checkpoint_id = excluded.checkpoint_id;
+                END
+            """)
+        self._storage_ready = True
+
+    def save_checkpoint(self, checkpoint: Checkpoint) -> int:
         """
         Сохранить чекпоинт
 
@@ -40,25 +174,71 @@ class CheckpointManager:
             checkpoint: Объект чекпоинта
 
         Returns:
-            Имя файла чекпоинта
+            Идентификатор записи чекпоинта
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{checkpoint.operation_type}_{checkpoint.channel_id}_{timestamp}.json"
-        filepath = self.checkpoints_dir / filename
+        return self._save_checkpoints([checkpoint])[0]
 
-        checkpoint.timestamp = datetime.now().isoformat()
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(asdict(checkpoint), f, indent=2, ensure_ascii=False)
+    async def save_checkpoint_async(self, checkpoint: Checkpoint) -> Optional[int]:
+        """
+        Сохранить чекпоинт, не блокируя цикл событий
 
-        # Также сохраняем последний чекпоинт для данной операции
-        latest_filename = f"latest_{checkpoint.operation_type}_{checkpoint.channel_id}.json"
-        latest_filepath = self.checkpoints_dir / latest_filename
+        Запись выполняется в отдельном потоке. Если несколько чекпоинтов одной
+        операции приходят, пока идёт запись, сохраняется только последний из них,
+        а все ожидающие записи сбрасываются одной транзакцией.
 
-        with open(latest_filepath, 'w', encoding='utf-8') as f:
-            json.dump(asdict(checkpoint), f, indent=2, ensure_ascii=False)
+        Args:
+            checkpoint: Объект чекпоинта
 
-        return str(filepath)
+        Returns:
+            Идентификатор записи чекпоинта или None, если его вытеснил более новый
+        """
+        self._pending[(checkpoint.operation_type, checkpoint.channel_id)] = checkpoint
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_pending())
+        saved = await asyncio.shield(self._flush_task)
+        return saved.get(id(checkpoint))
+
+    async def _flush_pending(self) -> Dict[int, int]:
+        """Записать накопленные чекпоинты; возвращает id(объекта) -> id записи"""
+        saved: Dict[int, int] = {}
+        try:
+            while self._pending:
+                batch = list(self._pending.values())
+                self._pending = {}
+                ids = await asyncio.to_thread(self._save_checkpoints, batch)
+                saved.update(zip(map(id, batch), ids))
+        finally:
+            self._flush_task = None
+        return saved
+
+    def _save_checkpoints(self, checkpoints: List[Checkpoint]) -> List[int]:
+        """Записать чекпоинты в журнал одной транзакцией"""
+        rows = []
+        for checkpoint in checkpoints:
+            checkpoint.timestamp = datetime.now().isoformat()
+            rows.append((
+                checkpoint.operation_type,
+                checkpoint.channel_id,
+                checkpoint.timestamp,
+                _dumps(asdict(checkpoint)),
+            ))
+
+        checkpoint_ids = []
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    cursor = db.execute("""
+                        INSERT INTO checkpoints (operation_type, channel_id, timestamp, payload)
+                        VALUES (?, ?, ?, ?)
+                    """, row)
+                    checkpoint_ids.append(cursor.lastrowid)
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+        return checkpoint_ids
 
     def load_latest_checkpoint(self, operation_type: str, channel_id: int) -> Optional[Checkpoint]:
         """
@@ -71,16 +251,18 @@ class CheckpointManager:
         Returns:
             Объект чекпоинта или None
         """
-        filename = f"latest_{operation_type}_{channel_id}.json"
-        filepath = self.checkpoints_dir / filename
-
-        if not filepath.exists():
-            return None
-
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return Checkpoint(**data)
+            with closing(self._connect()) as db:
+                row = db.execute("""
+                    SELECT c.payload
+                    FROM latest_checkpoints l
+                    JOIN checkpoints c ON c.id = l.checkpoint_id
+                    WHERE l.operation_type = ? AND l.channel_id = ?
+                """, (operation_type, channel_id)).fetchone()
+
+            if not row:
+                return None
+            return Checkpoint(**_loads(row[0]))
         except Exception as e:
             print(f"Ошибка загрузки чекпоинта: {e}")
             return None
@@ -95,23 +277,54 @@ class CheckpointManager:
         Returns:
             Список чекпоинтов
         """
-        checkpoints = []
+        checkpoints = self._load_cached_checkpoints()
+        if operation_type:
+            return [cp for cp in checkpoints if cp.operation_type == operation_type]
+        return list(checkpoints)
 
-        for file_path in self.checkpoints_dir.glob("*.json"):
-            if file_path.name.startswith("latest_"):
-                continue
+    def load_all_checkpoint_metas(self, operation_type: Optional[str] = None) -> List[Tuple[str, int, str, int]]:
+        """
+        Получить метаданные чекпоинтов без разбора их содержимого
 
-            if operation_type and not file_path.name.startswith(f"{operation_type}_"):
-                continue
+        Args:
+            operation_type: Фильтр по типу операции
+
+        Returns:
+            Список кортежей (operation_type, channel_id, timestamp, id), новые первыми
+        """
+        query = "SELECT operation_type, channel_id, timestamp, id FROM checkpoints"
+        params = []
+        if operation_type:
+            query += " WHERE operation_type = ?"
+            params.append(operation_type)
+        query += " ORDER BY timestamp DESC, id DESC"
+
+        with closing(self._connect()) as db:
+            return db.execute(query, params).fetchall()
+
+    def _load_cached_checkpoints(self) -> list:
+        """Вернуть все чекпоинты, перечитывая журнал только если он изменился"""
+        with closing(self._connect()) as db:
+            # AUTOINCREMENT не переиспользует id, поэтому пара (MAX(id), COUNT(*))
+            # меняется при любой вставке или удалении, в том числе из другого менеджера
+            version = db.execute("SELECT MAX(id), COUNT(*) FROM checkpoints").fetchone()
+            if self._cache is not None and version == self._cache_version:
+                return self._cache
+
+            rows = db.execute("""
+                SELECT id, payload FROM checkpoints ORDER BY timestamp DESC, id DESC
+            """).fetchall()
 
+        checkpoints = []
+        for checkpoint_id, payload in rows:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                checkpoints.append(Checkpoint(**data))
+                checkpoints.append(Checkpoint(**_loads(payload)))
             except Exception as e:
-                print(f"Ошибка загрузки чекпоинта {file_path}: {e}")
+                print(f"Ошибка загрузки чекпоинта {checkpoint_id}: {e}")
 
-        return sorted(checkpoints, key=lambda x: x.timestamp, reverse=True)
+        self._cache = checkpoints
+        self._cache_version = version
+        return checkpoints
 
     def delete_checkpoint(self, operation_type: str, channel_id: int, timestamp: str = None):
         """
@@ -120,19 +333,21 @@ class CheckpointManager:
         Args:
             operation_type: Тип операции
             channel_id: ID канала
-            timestamp: Временная метка чекпоинта
+            timestamp: Временная метка чекпоинта (Checkpoint.timestamp)
         """
-        if timestamp:
-            filename = f"{operation_type}_{channel_id}_{timestamp}.json"
-            filepath = self.checkpoints_dir / filename
-            if filepath.exists():
-                filepath.unlink()
-
-        # Удаляем latest чекпоинт
-        latest_filename = f"latest_{operation_type}_{channel_id}.json"
-        latest_filepath = self.checkpoints_dir / latest_filename
-        if latest_filepath.exists():
-            latest_filepath.unlink()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            if timestamp:
+                db.execute("""
+                    DELETE FROM checkpoints
+                    WHERE operation_type = ? AND channel_id = ? AND timestamp = ?
+                """, (operation_type, channel_id, timestamp))
+
+            # Удаляем latest чекпоинт
+            db.execute("""
+                DELETE FROM latest_checkpoints WHERE operation_type = ? AND channel_id = ?
+            """, (operation_type, channel_id))
+            db.execute("COMMIT")
 
     def clean_old_checkpoints(self, keep_count: int = 5):
         """
@@ -141,25 +356,23 @@ class CheckpointManager:
         Args:
             keep_count: Сколько последних чекпоинтов оставить
         """
-        checkpoints = self.load_all_checkpoints()
-
-        # Группируем по operation_type и channel_id
-        grouped = {}
-        for checkpoint in checkpoints:
-            key = (checkpoint.operation_type, checkpoint.channel_id)
-            if key not in grouped:
-                grouped[key] = []
-            grouped[key].append(checkpoint)
-
-        # Оставляем только последние keep_count для каждой группы
-        for (op_type, channel_id), cp_list in grouped.items():
-            cp_list.sort(key=lambda x: x.timestamp, reverse=True)
-            for checkpoint in cp_list[keep_count:]:
-                self.delete_checkpoint(
-                    checkpoint.operation_type,
-                    checkpoint.channel_id,
-                    checkpoint.timestamp.replace(':', '').replace('-', '')
+        # Оставляем только последние keep_count для каждой пары operation_type и channel_id
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("""
+                DELETE FROM checkpoints
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY operation_type, channel_id
+                            ORDER BY timestamp DESC, id DESC
+                        ) AS position
+                        FROM checkpoints
+                    )
+                    WHERE position > ?
                 )
+            """, (keep_count,))
+            db.execute("COMMIT")
 
     def get_progress_percentage(self, checkpoint: Checkpoint) -> float:
         """Получить процент выполнения"""
@@ -179,22 +392,56 @@ class CheckpointManager:
             for key, value in checkpoint.metadata.items():
                 print(f"  {key}: {value}")
 
-    def save_batch_data(self, data: Any, filename: str) -> str:
+    def save_batch_data(self, data: Any, filename: str, use_arrow: bool = True) -> str:
         """
-        Сохранить пакет данных (pickle для сложных объектов)
+        Сохранить пакет данных
+
+        Табличные данные (DataFrame или список однородных словарей со скалярными
+        значениями) сохраняются в Arrow IPC со сжатием LZ4, если установлен
+        pyarrow; остальное - через pickle, чтобы данные не искажались.
 
         Args:
             data: Данные для сохранения
             filename: Имя файла
+            use_arrow: Разрешить формат Arrow для табличных данных
 
         Returns:
             Путь к файлу
         """
+        self.checkpoints_dir.mkdir(exist_ok=True)
         filepath = self.checkpoints_dir / filename
+
+        table = self._to_arrow_table(data) if use_arrow else None
+        if table is not None:
+            feather.write_feather(table, filepath, compression='lz4')
+            return str(filepath)
+
         with open(filepath, 'wb') as f:
             pickle.dump(data, f)
         return str(filepath)
 
+    @staticmethod
+    def _to_arrow_table(data: Any) -> Optional['pa.Table']:
+        """Преобразовать табличные данные в Arrow, None если это невозможно"""
+        if pa is None:
+            return None
+
+        try:
+            if isinstance(data, pd.DataFrame):
+                table, kind = pa.Table.from_pandas(data), b"dataframe"
+            elif (isinstance(data, list) and data and all(type(row) is dict for row in data)
+                    and _records_fit_arrow(data)):
+                table, kind = pa.Table.from_pylist(data), b"records"
+            else:
+                return None
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Неоднородные типы в столбцах - оставляем pickle
+            return None
+
+        metadata = dict(table.schema.metadata or {})
+        metadata[_ARROW_KIND_KEY] = kind
+        return table.replace_schema_metadata(metadata)
+
     def load_batch_data(self, filename: str) -> Any:
         """
         Загрузить пакет данных
@@ -207,7 +454,18 @@ class CheckpointManager:
         """
         filepath = self.checkpoints_dir / filename
         with open(filepath, 'rb') as f:
-            return pickle.load(f)
+            is_arrow = f.read(len(_ARROW_MAGIC)) == _ARROW_MAGIC
+            if not is_arrow:
+                f.seek(0)
+                return pickle.load(f)
+
+        if pa is None:
+            raise RuntimeError(f"Для загрузки {filepath} требуется pyarrow")
+
+        table = feather.read_table(filepath, memory_map=True)
+        if (table.schema.metadata or {}).get(_ARROW_KIND_KEY) == b"dataframe":
+            return table.to_pandas()
+        return table.to_pylist()
 
     def list_checkpoints(self) -> Dict[str, list]:
         """
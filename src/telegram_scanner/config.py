@@ -1,12 +1,113 @@
 import os
+import functools
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Optional, Dict, Tuple, Any, Mapping
 from pathlib import Path
 
 
+# Схема переменных окружения: ключ -> (тип, значение по умолчанию, обязательна).
+# Имя атрибута Config совпадает с ключом в нижнем регистре
+_ENV_SCHEMA: Dict[str, Tuple[type, Any, bool]] = {
+    # Telegram API настройки
+    "API_ID": (int, 0, True),
+    "API_HASH": (str, None, True),
+    "PHONE_NUMBER": (str, None, True),
+
+    # Настройки базы данных
+    "DATABASE_NAME": (str, "channel_users.db", False),
+
+    # Настройки экспорта
+    "BATCH_SIZE": (int, 2000, False),
+    "CHECKPOINT_INTERVAL": (int, 10000, False),
+    "REQUEST_DELAY": (float, 0.033, False),  # ~30 запросов в секунду
+    "EXPORT_CONCURRENCY": (int, 4, False),  # одновременных запросов страниц участников
+
+    # Настройки канала
+    "CHANNEL_USERNAME": (str, None, False),
+
+    # Настройки удаления
+    "DELETE_BATCH_SIZE": (int, 100, False),
+    "DELETE_DELAY": (float, 0.1, False),
+    "DELETE_CONCURRENCY": (int, 5, False),  # одновременных запросов на удаление
+    "DELETE_CONFIRMATION": (bool, True, False),
+
+    # Настройки отчетов
+    "EXPORT_DELETED_USERS": (bool, True, False),
+
+    # Дополнительные настройки
+    "MAX_RETRIES": (int, 3, False),
+    "TIMEOUT": (int, 30, False),
+    "FLOOD_SLEEP_THRESHOLD": (int, 30, False),  # FloodWait короче (сек) Telethon пережидает сам
+}
+
+_TYPE_ERRORS = {
+    int: "должна быть целым числом",
+    float: "должна быть числом",
+}
+
+
+def _parse_env(env: Mapping[str, str]) -> Dict[str, Any]:
+    """Разобрать переменные окружения по схеме за один проход, собрав все ошибки"""
+    values: Dict[str, Any] = {}
+    errors = []
+
+    for key, (value_type, default, required) in _ENV_SCHEMA.items():
+        raw = env.get(key)
+
+        if value_type is bool:
+            values[key] = (raw if raw is not None else str(default)).lower() in ('true', '1', 'yes', 'on')
+            continue
+
+        if raw is None or (value_type is str and not raw):
+            if required:
+                errors.append(f"Переменная окружения {key} обязательна для заполнения")
+            values[key] = raw if raw is not None else default
+            continue
+
+        try:
+            values[key] = value_type(raw)
+        except ValueError:
+            errors.append(f"Переменная окружения {key} {_TYPE_ERRORS[value_type]}")
+
+    if errors:
+        raise ValueError("; ".join(errors))
+    return values
+
+
 class Config:
     """Класс для управления конфигурацией приложения"""
 
+    # Telegram API настройки
+    api_id: int
+    api_hash: str
+    phone_number: str
+
+    # Настройки базы данных
+    database_name: str
+
+    # Настройки экспорта
+    batch_size: int
+    checkpoint_interval: int
+    request_delay: float
+    export_concurrency: int
+
+    # Настройки канала
+    channel_username: Optional[str]
+
+    # Настройки удаления
+    delete_batch_size: int
+    delete_delay: float
+    delete_concurrency: int
+    delete_confirmation: bool
+
+    # Настройки отчетов
+    export_deleted_users: bool
+
+    # Дополнительные настройки
+    max_retries: int
+    timeout: int
+    flood_sleep_threshold: int
+
     def __init__(self, env_file: str = ".env"):
         # Загружаем переменные окружения из корня проекта
         # .env файл должен быть в корне проекта
@@ -15,34 +116,10 @@ class Config:
         if env_path.exists():
             load_dotenv(env_path)
 
-        # Telegram API настройки
-        self.api_id: int = self._get_int_env("API_ID", default=0, required=True)
-        self.api_hash: str = self._get_str_env("API_HASH", default=None, required=True)
-        self.phone_number: str = self._get_str_env("PHONE_NUMBER", default=None, required=True)
-
-        # Настройки базы данных
-        self.database_name: str = self._get_str_env("DATABASE_NAME", "channel_users.db")
-
-        # Настройки экспорта
-        self.batch_size: int = self._get_int_env("BATCH_SIZE", 2000)
-        self.checkpoint_interval: int = self._get_int_env("CHECKPOINT_INTERVAL", 10000)
-        self.request_delay: float = self._get_float_env("REQUEST_DELAY", 0.033)  # ~30 запросов в секунду
-
-        # Настройки канала
-        self.channel_username: Optional[str] = self._get_str_env("CHANNEL_USERNAME", None)
+        for key, value in _parse_env(os.environ).items():
+            setattr(self, key.lower(), value)
 
-        # Настройки удаления
-        self.delete_batch_size: int = self._get_int_env("DELETE_BATCH_SIZE", 100)
-        self.delete_delay: float = self._get_float_env("DELETE_DELAY", 0.1)
-        self.delete_confirmation: bool = self._get_bool_env("DELETE_CONFIRMATION", True)
-
-        # Настройки отчетов
-        self.export_deleted_users: bool = self._get_bool_env("EXPORT_DELETED_USERS", True)
-
-        # Дополнительные настройки
         self.session_name: str = "telegram_scanner_session"
-        self.max_retries: int = self._get_int_env("MAX_RETRIES", 3)
-        self.timeout: int = self._get_int_env("TIMEOUT", 30)
 
         # Пути к файлам
         # base_dir должен указывать на корень проекта, где находится .env файл
@@ -50,42 +127,6 @@ class Config:
         self.db_path = self.base_dir / self.database_name
         self.session_path = self.base_dir / f"{self.session_name}.session"
 
-    def _get_str_env(self, key: str, default: Optional[str] = None, required: bool = False) -> Optional[str]:
-        """Получить строковую переменную окружения"""
-        value = os.getenv(key, default)
-        if required and not value:
-            raise ValueError(f"Переменная окружения {key} обязательна для заполнения")
-        return value
-
-    def _get_int_env(self, key: str, default: int, required: bool = False) -> int:
-        """Получить целочисленную переменную окружения"""
-        value = os.getenv(key)
-        if value is None:
-            if required:
-                raise ValueError(f"Переменная окружения {key} обязательна для заполнения")
-            return default
-        try:
-            return int(value)
-        except ValueError:
-            raise ValueError(f"Переменная окружения {key} должна быть целым числом")
-
-    def _get_float_env(self, key: str, default: float, required: bool = False) -> float:
-        """Получить переменную окружения типа float"""
-        value = os.getenv(key)
-        if value is None:
-            if required:
-                raise ValueError(f"Переменная окружения {key} обязательна для заполнения")
-            return default
-        try:
-            return float(value)
-        except ValueError:
-            raise ValueError(f"Переменная окружения {key} должна быть числом")
-
-    def _get_bool_env(self, key: str, default: bool) -> bool:
-        """Получить булеву переменную окружения"""
-        value = os.getenv(key, str(default)).lower()
-        return value in ('true', '1', 'yes', 'on')
-
     def validate(self) -> bool:
         """Проверить корректность конфигурации"""
         errors = []
@@ -110,6 +151,15 @@ class Config:
         if self.checkpoint_interval <= 0:
             errors.append("CHECKPOINT_INTERVAL должен быть положительным числом")
 
+        if self.export_concurrency <= 0:
+            errors.append("EXPORT_CONCURRENCY должен быть положительным числом")
+
+        if self.delete_concurrency <= 0:
+            errors.append("DELETE_CONCURRENCY должен быть положительным числом")
+
+        if self.flood_sleep_threshold < 0:
+            errors.append("FLOOD_SLEEP_THRESHOLD не может быть отрицательным")
+
         if errors:
             print("Ошибка в конфигурации:")
             for error in errors:
@@ -128,11 +178,34 @@ class Config:
         print(f"Batch Size: {self.batch_size}")
         print(f"Checkpoint Interval: {self.checkpoint_interval}")
         print(f"Request Delay: {self.request_delay:.3f}s")
+        print(f"Export Concurrency: {self.export_concurrency}")
         print(f"Delete Batch Size: {self.delete_batch_size}")
         print(f"Delete Delay: {self.delete_delay}s")
+        print(f"Delete Concurrency: {self.delete_concurrency}")
         print(f"Delete Confirmation: {self.delete_confirmation}")
+        print(f"Flood Sleep Threshold: {self.flood_sleep_threshold}s")
         print("=" * 30 + "\n")
 
 
+@functools.cache
+def get_config() -> Config:
+    """Получить глобальный экземпляр конфигурации (создается при первом обращении)"""
+    return Config()
+
+
+class _LazyConfig:
+    """Прокси к глобальной конфигурации: .env и переменные окружения читаются
+    при первом обращении к атрибуту, а не при импорте модуля"""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_config(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(get_config(), name, value)
+
+    def __repr__(self) -> str:
+        return f"<lazy {get_config()!r}>"
+
+
 # Глобальный экземпляр конфигурации
-config = Config()
\ No newline at end of file
+config = _LazyConfig()
\ No newline at end of file
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+
+async def ainput(prompt: str = "") -> str:
+    """
+    input() без блокировки цикла событий
+
+    Чтение идет в отдельном daemon-потоке: фоновые задачи (запись в базу,
+    сохранение чекпоинтов) продолжают работать, пока пользователь думает.
+    Поток не из пула asyncio.to_thread, поэтому незавершенный ввод после
+    Ctrl+C не задерживает выход из программы.
+
+    Raises:
+        EOFError: stdin закрыт или недоступен
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(setter, value):
+        # Ожидание могло быть отменено, пока пользователь вводил строку
+        if not future.done():
+            setter(value)
+
+    def read():
+        try:
+            result = input(prompt)
+        except BaseException as e:
+            callback = (deliver, future.set_exception, e)
+        else:
+            callback = (deliver, future.set_result, result)
+        try:
+            loop.call_soon_threadsafe(*callback)
+        except RuntimeError:
+            # Цикл событий уже закрыт - ответ никому не нужен
+            pass
+
+    threading.Thread(target=read, name="console-input", daemon=True).start()
+    return await future
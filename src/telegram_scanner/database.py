@@ -1,11 +1,30 @@
+import asyncio
+import json
 import sqlite3
+import time
 import aiosqlite
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Optional, AsyncGenerator
+from typing import List, Dict, Optional, AsyncGenerator, AsyncIterator, Tuple
 from dataclasses import dataclass, asdict
 
 
-@dataclass
+# Условие отбора кандидатов в удаленные аккаунты (LIKE в SQLite регистронезависим
+# для ASCII). Используется для заполнения флага в уже существующих базах
+_DELETED_CANDIDATE_SQL = (
+    "(first_name LIKE 'Deleted%' OR first_name IS NULL) AND "
+    "(last_name LIKE 'Account%' OR last_name LIKE 'User%' OR last_name IS NULL)"
+)
+
+
+def _is_deleted_candidate(first_name: Optional[str], last_name: Optional[str]) -> bool:
+    """То же условие, что и _DELETED_CANDIDATE_SQL, вычисленное при вставке"""
+    if first_name is not None and first_name[:7].lower() != 'deleted':
+        return False
+    return last_name is None or last_name[:7].lower() == 'account' or last_name[:4].lower() == 'user'
+
+
+@dataclass(slots=True)
 class User:
     id: int
     access_hash: int
@@ -21,7 +40,13 @@ class User:
     premium: bool = False
     added_date: Optional[datetime] = None
 
-    def to_tuple(self) -> tuple:
+    def to_tuple(self, added_date_iso: Optional[str] = None) -> tuple:
+        """
+        Строка для вставки; added_date_iso передается один раз на всю пачку
+
+        Флаги отдаются как 0/1: sqlite3 привязывает int напрямую, а bool
+        проходит через поиск адаптера и заметно замедляет executemany.
+        """
         return (
             self.id,
             self.access_hash,
@@ -29,137 +54,403 @@ class User:
             self.first_name,
             self.last_name,
             self.photo_id,
-            self.bot,
-            self.verified,
-            self.restricted,
+            1 if self.bot else 0,
+            1 if self.verified else 0,
+            1 if self.restricted else 0,
             self.status,
             self.last_online.isoformat() if self.last_online else None,
-            self.premium,
-            datetime.now().isoformat()
+            1 if self.premium else 0,
+            added_date_iso or datetime.now().isoformat(),
+            1 if _is_deleted_candidate(self.first_name, self.last_name) else 0
         )
 
 
+# Пачка пользователей в очереди фоновой записи: (users, channel_id, channel_username)
+_UserBatch = Tuple[List[User], int, str]
+
+# Сколько ожидающих пачек фоновая запись объединяет в одну транзакцию
+_WRITER_COALESCE = 8
+
+
+# Настройки, применяемые к соединению сразу после открытия
+_CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+    # Файл базы отображается в память (256 МБ), а кэш страниц увеличен до ~64 МБ:
+    # сканирование таблицы users идет без лишних read() и держит горячие страницы
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+# Размер кэша подготовленных выражений sqlite3 на соединение
+_STATEMENT_CACHE_SIZE = 256
+
+# Часто выполняемые запросы. Текст неизменен, поэтому на общем соединении каждый
+# из них компилируется SQLite один раз и дальше берется из кэша выражений.
+# Повторная выгрузка обновляет строки на месте (ON CONFLICT DO UPDATE), а не
+# удаляет и вставляет их заново, как INSERT OR REPLACE. INSERT OR IGNORE не
+# подходит: при повторной выгрузке имена и статусы должны обновляться, иначе
+# аккаунты, удаленные после первой выгрузки, не попадут в кандидаты
+_INSERT_USER_SQL = """
+    INSERT INTO users (
+        id, access_hash, username, first_name, last_name,
+        photo_id, bot, verified, restricted, status, last_online,
+        premium, added_date, is_deleted_candidate, channel_id, channel_username
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        access_hash = excluded.access_hash,
+        username = excluded.username,
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        photo_id = excluded.photo_id,
+        bot = excluded.bot,
+        verified = excluded.verified,
+        restricted = excluded.restricted,
+        status = excluded.status,
+        last_online = excluded.last_online,
+        premium = excluded.premium,
+        added_date = COALESCE(added_date, excluded.added_date),
+        is_deleted_candidate = excluded.is_deleted_candidate,
+        channel_id = excluded.channel_id,
+        channel_username = excluded.channel_username
+"""
+
+_INSERT_DELETION_LOG_SQL = """
+    INSERT INTO deletion_log
+    (user_id, username, deletion_time, status, error_message)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+_UPSERT_PROGRESS_SQL = """
+    INSERT INTO export_progress
+    (channel_id, channel_username, total_members,
+     processed_members, last_user_id, status,
+     created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(channel_id) DO UPDATE SET
+        channel_username = excluded.channel_username,
+        total_members = excluded.total_members,
+        processed_members = excluded.processed_members,
+        last_user_id = excluded.last_user_id,
+        status = excluded.status,
+        updated_at = excluded.updated_at
+"""
+
+# Список ID передается одним JSON-параметром, а не набором плейсхолдеров,
+# чтобы текст запроса не зависел от размера пачки
+_MOVE_TO_DELETED_SQL = """
+    INSERT OR IGNORE INTO deleted_users
+    (id, access_hash, username, first_name, last_name,
+     photo_id, bot, status, last_online, channel_id, channel_username,
+     deletion_reason, found_at)
+    SELECT id, access_hash, username, first_name, last_name,
+           photo_id, bot, status, last_online, channel_id, channel_username,
+           ?, ?
+    FROM users
+    WHERE id IN (SELECT value FROM json_each(?))
+"""
+
+_DELETE_USERS_SQL = "DELETE FROM users WHERE id IN (SELECT value FROM json_each(?))"
+
+_USERS_BY_IDS_SQL = """
+    SELECT id, access_hash, username, first_name, last_name
+    FROM users
+    WHERE id IN (SELECT value FROM json_each(?))
+"""
+
+# Сколько секунд переиспользуются сводные числа отчетов, если база не менялась
+_HEADER_STATS_TTL = 5.0
+
+# Агрегаты журнала удалений: общие для get_deletion_stats и get_report_header_stats
+_DELETION_STATS_COLUMNS = """
+    COUNT(*),
+    COUNT(CASE WHEN status = 'success' THEN 1 END),
+    COUNT(CASE WHEN status = 'error' THEN 1 END),
+    COUNT(CASE WHEN error_message IS NOT NULL THEN 1 END)
+"""
+
+
+def _deletion_stats(row) -> Dict:
+    """Словарь статистики удалений из четырех агрегатов _DELETION_STATS_COLUMNS"""
+    total, successful, failed, with_errors = row or (0, 0, 0, 0)
+    return {'total': total, 'successful': successful, 'failed': failed, 'with_errors': with_errors}
+
+
 class DatabaseManager:
-    def __init__(self, db_name: str = "channel_users.db"):
+    def __init__(self, db_name: str = "channel_users.db", wal: bool = True):
         self.db_name = db_name
-        self.connection = None
+        # WAL можно отключить для баз на сетевых файловых системах
+        self.wal = wal
+        self.journal_mode: Optional[str] = None
+        self.connection: Optional[aiosqlite.Connection] = None
+        # Транзакции записи и чтения на общем соединении не должны перемежаться
+        # между корутинами: иначе чтение видит еще не зафиксированные строки
+        self._lock = asyncio.Lock()
+        # Фоновая запись пользователей (включается через start_writer)
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._writer_error: Optional[BaseException] = None
         self._schema_upgraded = False
+        # Сводные числа отчетов по channel_id: (время получения, результат);
+        # сбрасываются любой транзакцией записи
+        self._header_stats_cache: Dict[Optional[int], Tuple[float, Dict]] = {}
+
+    async def _get_connection(self) -> aiosqlite.Connection:
+        """Получить общее соединение с базой, открыв его при первом обращении"""
+        if self.connection is None:
+            connection = await aiosqlite.connect(self.db_name, cached_statements=_STATEMENT_CACHE_SIZE)
+            for pragma in _CONNECTION_PRAGMAS:
+                await connection.execute(pragma)
+            if self.wal:
+                await self._enable_wal(connection)
+            self.connection = connection
+        return self.connection
+
+    @asynccontextmanager
+    async def _immediate_transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Выполнить запись одной транзакцией BEGIN IMMEDIATE ... COMMIT"""
+        db = await self._get_connection()
+        async with self._lock:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                await db.execute("ROLLBACK")
+                self._header_stats_cache.clear()
+                raise
+            await db.execute("COMMIT")
+            # Кэш сводных чисел отчетов больше не соответствует базе
+            self._header_stats_cache.clear()
+
+    @asynccontextmanager
+    async def _locked_connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Общее соединение вне чужой транзакции записи (для чтения и служебных команд)"""
+        db = await self._get_connection()
+        async with self._lock:
+            yield db
+
+    async def _enable_wal(self, connection: aiosqlite.Connection):
+        """Включить WAL: читатели не блокируются записью, коммиты без лишних fsync"""
+        async with connection.execute("PRAGMA journal_mode=WAL") as cursor:
+            row = await cursor.fetchone()
+        self.journal_mode = row[0].lower() if row else None
+        if self.journal_mode != "wal":
+            print(f"Не удалось включить WAL, используется режим журнала: {self.journal_mode}")
+            return
+        # synchronous не сохраняется в файле базы и задается для каждого соединения
+        await connection.execute("PRAGMA synchronous=NORMAL")
 
     async def init_database(self):
         """Инициализация базы данных и создание таблиц"""
-        async with aiosqlite.connect(self.db_name) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY,
-                    access_hash INTEGER NOT NULL,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    photo_id INTEGER,
-                    bot BOOLEAN DEFAULT FALSE,
-                    verified BOOLEAN DEFAULT FALSE,
-                    restricted BOOLEAN DEFAULT FALSE,
-                    status TEXT,
-                    last_online TEXT,
-                    premium BOOLEAN DEFAULT FALSE,
-                    added_date TEXT,
-                    channel_id INTEGER,
-                    channel_username TEXT
-                )
-            """)
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_users_first_name ON users(first_name)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_users_last_name ON users(last_name)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_users_status ON users(status)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_users_bot ON users(bot)")
-
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS deleted_users (
-                    id INTEGER PRIMARY KEY,
-                    access_hash INTEGER NOT NULL,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    photo_id INTEGER,
-                    bot BOOLEAN DEFAULT FALSE,
-                    status TEXT,
-                    last_online TEXT,
-                    channel_id INTEGER,
-                    channel_username TEXT,
-                    deletion_reason TEXT,
-                    found_at TEXT
-                )
-            """)
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_deleted_users_first_name ON deleted_users(first_name)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_deleted_users_last_name ON deleted_users(last_name)")
-
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS export_progress (
-                    channel_id INTEGER PRIMARY KEY,
-                    channel_username TEXT,
-                    total_members INTEGER,
-                    processed_members INTEGER DEFAULT 0,
-                    last_user_id INTEGER,
-                    last_date TEXT,
-                    status TEXT DEFAULT 'in_progress',
-                    created_at TEXT,
-                    updated_at TEXT
-                )
-            """)
-
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS deletion_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    username TEXT,
-                    deletion_time TEXT,
-                    status TEXT,
-                    error_message TEXT
-                )
-            """)
-
-            await db.commit()
+        async with self._locked_connection() as db:
+            await self._create_tables(db)
+
+    async def _create_tables(self, db: aiosqlite.Connection):
+        """Создать таблицы и обновить схему (под self._lock)"""
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                access_hash INTEGER NOT NULL,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                photo_id INTEGER,
+                bot BOOLEAN DEFAULT FALSE,
+                verified BOOLEAN DEFAULT FALSE,
+                restricted BOOLEAN DEFAULT FALSE,
+                status TEXT,
+                last_online TEXT,
+                premium BOOLEAN DEFAULT FALSE,
+                added_date TEXT,
+                is_deleted_candidate INTEGER NOT NULL DEFAULT 0,
+                channel_id INTEGER,
+                channel_username TEXT
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_first_name ON users(first_name)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_last_name ON users(last_name)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_status ON users(status)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_bot ON users(bot)")
+
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS deleted_users (
+                id INTEGER PRIMARY KEY,
+                access_hash INTEGER NOT NULL,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                photo_id INTEGER,
+                bot BOOLEAN DEFAULT FALSE,
+                status TEXT,
+                last_online TEXT,
+                channel_id INTEGER,
+                channel_username TEXT,
+                deletion_reason TEXT,
+                found_at TEXT
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_deleted_users_first_name ON deleted_users(first_name)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_deleted_users_last_name ON deleted_users(last_name)")
+
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS export_progress (
+                channel_id INTEGER PRIMARY KEY,
+                channel_username TEXT,
+                total_members INTEGER,
+                processed_members INTEGER DEFAULT 0,
+                last_user_id INTEGER,
+                last_date TEXT,
+                status TEXT DEFAULT 'in_progress',
+                created_at TEXT,
+                updated_at TEXT
+            )
+        """)
+
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS deletion_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                username TEXT,
+                deletion_time TEXT,
+                status TEXT,
+                error_message TEXT
+            )
+        """)
+
+        await db.commit()
 
         # Попытка добавить недостающие столбцы для существующих БД
         if not self._schema_upgraded:
-            await self._upgrade_schema()
+            await self._upgrade_schema(db)
             self._schema_upgraded = True
 
-    async def _upgrade_schema(self):
-        """Добавить новые столбцы, если они отсутствуют."""
-        async with aiosqlite.connect(self.db_name) as db:
-            for table in ("users", "deleted_users"):
-                try:
-                    await db.execute(f"ALTER TABLE {table} ADD COLUMN photo_id INTEGER")
-                except Exception:
-                    pass
+        # Обновить статистику планировщика для долгоживущего соединения
+        # (0x10002: анализировать все таблицы, где она устарела или отсутствует)
+        await db.execute("PRAGMA optimize=0x10002")
+
+    async def ensure_statistics(self):
+        """Собрать статистику ANALYZE, если ее еще нет (после первой полной выгрузки)"""
+        async with self._locked_connection() as db:
+            async with db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            ) as cursor:
+                if await cursor.fetchone():
+                    return
+            await db.execute("ANALYZE")
             await db.commit()
 
+    async def _upgrade_schema(self, db: aiosqlite.Connection):
+        """Добавить новые столбцы, если они отсутствуют."""
+        for table in ("users", "deleted_users"):
+            try:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN photo_id INTEGER")
+            except Exception:
+                pass
+
+        try:
+            await db.execute("ALTER TABLE users ADD COLUMN is_deleted_candidate INTEGER NOT NULL DEFAULT 0")
+        except Exception:
+            pass
+        else:
+            # Столбец только что добавлен - заполняем флаг для уже выгруженных пользователей
+            await db.execute(f"UPDATE users SET is_deleted_candidate = 1 WHERE {_DELETED_CANDIDATE_SQL}")
+
+        # Частичный индекс содержит только кандидатов, поэтому поиск не сканирует таблицу
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_users_deleted_candidate
+            ON users(is_deleted_candidate) WHERE is_deleted_candidate = 1
+        """)
+        await db.commit()
+
     async def insert_users_batch(self, users: List[User], channel_id: int, channel_username: str) -> int:
-        """Пакетная вставка пользователей"""
+        """Пакетная вставка пользователей (в очередь, если запущена фоновая запись)"""
         if not users:
             return 0
 
-        async with aiosqlite.connect(self.db_name) as db:
-            values = [
-                (*user.to_tuple(), channel_id, channel_username)
-                for user in users
-            ]
+        if self._write_queue is not None:
+            self._raise_writer_error()
+            await self._write_queue.put((users, channel_id, channel_username))
+            return len(users)
 
-            await db.executemany("""
-                INSERT OR REPLACE INTO users (
-                    id, access_hash, username, first_name, last_name,
-                    photo_id, bot, verified, restricted, status, last_online,
-                    premium, added_date, channel_id, channel_username
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, values)
+        await self._write_user_batches([(users, channel_id, channel_username)])
+        return len(users)
+
+    async def _write_user_batches(self, batches: List[_UserBatch]):
+        """Записать несколько пачек пользователей одной транзакцией"""
+        # Время добавления одно на вызов; строки строятся лениво по мере вставки
+        now = datetime.now().isoformat()
+        values = (
+            (*user.to_tuple(now), channel_id, channel_username)
+            for users, channel_id, channel_username in batches
+            for user in users
+        )
 
-            await db.commit()
-            return len(users)
+        # executemany - один вызов в поток aiosqlite на всю транзакцию, поэтому
+        # отдельное синхронное соединение sqlite3 в to_thread здесь ничего не дает
+        async with self._immediate_transaction() as db:
+            await db.executemany(_INSERT_USER_SQL, values)
+
+    async def start_writer(self, max_pending: int = 16):
+        """
+        Запустить фоновую запись пользователей
+
+        insert_users_batch после этого только ставит пачку в очередь, а запись
+        идет параллельно с выгрузкой; несколько накопившихся пачек
+        записываются одной транзакцией.
+
+        Args:
+            max_pending: Сколько пачек может ждать записи, прежде чем
+                insert_users_batch начнет ждать освобождения очереди
+        """
+        if self._writer_task is not None:
+            return
+        self._write_queue = asyncio.Queue(maxsize=max_pending)
+        self._writer_task = asyncio.create_task(self._writer_loop(self._write_queue))
+
+    async def _writer_loop(self, queue: asyncio.Queue):
+        """Забирать пачки из очереди и записывать их, объединяя ожидающие"""
+        while True:
+            batches = [await queue.get()]
+            while len(batches) < _WRITER_COALESCE and not queue.empty():
+                batches.append(queue.get_nowait())
+            try:
+                # После ошибки пачки только снимаются с очереди, чтобы не зависал flush
+                if self._writer_error is None:
+                    await self._write_user_batches(batches)
+            except Exception as e:
+                self._writer_error = e
+            finally:
+                for _ in batches:
+                    queue.task_done()
+
+    def _raise_writer_error(self):
+        """Пробросить ошибку фоновой записи вызывающему коду"""
+        if self._writer_error is not None:
+            error, self._writer_error = self._writer_error, None
+            raise error
+
+    async def flush_writes(self):
+        """Дождаться записи всех пачек из очереди"""
+        if self._write_queue is not None:
+            await self._write_queue.join()
+        self._raise_writer_error()
+
+    async def stop_writer(self):
+        """Дописать очередь и остановить фоновую запись"""
+        if self._writer_task is None:
+            return
+        try:
+            await self.flush_writes()
+        finally:
+            task, self._writer_task, self._write_queue = self._writer_task, None, None
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
     async def get_total_users_count(self, channel_id: Optional[int] = None) -> int:
         """Получить общее количество пользователей"""
-        async with aiosqlite.connect(self.db_name) as db:
+        async with self._locked_connection() as db:
             if channel_id:
                 cursor = await db.execute(
                     "SELECT COUNT(*) FROM users WHERE channel_id = ?",
@@ -169,7 +460,29 @@ class DatabaseManager:
                 cursor = await db.execute("SELECT COUNT(*) FROM users")
 
             result = await cursor.fetchone()
-            return result[0] if result else 0
+        return result[0] if result else 0
+
+    @staticmethod
+    def _deleted_accounts_query(channel_id: Optional[int] = None, after_id: Optional[int] = None) -> tuple:
+        """Собрать запрос поиска удаленных аккаунтов и его параметры"""
+        conditions = ["is_deleted_candidate = 1"]
+
+        params = []
+        if channel_id:
+            conditions.append("channel_id = ?")
+            params.append(channel_id)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+
+        query = f"""
+            SELECT id, access_hash, username, first_name, last_name,
+                   bot, status, last_online, channel_id, channel_username
+            FROM users
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+        """
+        return query, params
 
     async def find_deleted_accounts(
         self,
@@ -177,50 +490,56 @@ class DatabaseManager:
         channel_id: Optional[int] = None
     ) -> List[Dict]:
         """Найти удаленные аккаунты"""
-        async with aiosqlite.connect(self.db_name) as db:
-            conditions = [
-                "(first_name LIKE 'Deleted%' OR first_name IS NULL)",
-                "(last_name LIKE 'Account%' OR last_name LIKE 'User%' OR last_name IS NULL)"
-            ]
-
-            params = []
-            if channel_id:
-                conditions.append("channel_id = ?")
-                params.append(channel_id)
-
-            query = f"""
-                SELECT id, access_hash, username, first_name, last_name,
-                       bot, status, last_online, channel_id, channel_username
-                FROM users
-                WHERE {' AND '.join(conditions)}
-                ORDER BY id
-            """
+        query, params = self._deleted_accounts_query(channel_id)
 
-            if limit:
-                query += f" LIMIT {limit}"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
 
+        async with self._locked_connection() as db:
             cursor = await db.execute(query, params)
             rows = await cursor.fetchall()
 
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    async def iter_deleted_accounts(
+        self,
+        channel_id: Optional[int] = None,
+        chunk_size: int = 10000
+    ) -> AsyncGenerator[List[Dict], None]:
+        """
+        Потоково выдавать удаленные аккаунты пачками, не загружая все строки в память
+
+        Каждая пачка - отдельный запрос после последнего выданного id: блокировка
+        соединения не удерживается, пока вызывающий код обрабатывает пачку,
+        и пачки не содержат строк незавершенной транзакции записи.
+        """
+        last_id = None
+        while True:
+            query, params = self._deleted_accounts_query(channel_id, after_id=last_id)
+            async with self._locked_connection() as db:
+                async with db.execute(query + " LIMIT ?", [*params, chunk_size]) as cursor:
+                    columns = [desc[0] for desc in cursor.description]
+                    rows = await cursor.fetchall()
+            if not rows:
+                break
+            yield [dict(zip(columns, row)) for row in rows]
+            if len(rows) < chunk_size:
+                break
+            last_id = rows[-1][0]
 
     async def get_users_by_ids(self, user_ids: List[int]) -> List[Dict]:
         """Получить пользователей по их ID"""
         if not user_ids:
             return []
 
-        async with aiosqlite.connect(self.db_name) as db:
-            placeholders = ','.join(['?' for _ in user_ids])
-            cursor = await db.execute(f"""
-                SELECT id, access_hash, username, first_name, last_name
-                FROM users
-                WHERE id IN ({placeholders})
-            """, user_ids)
-
+        async with self._locked_connection() as db:
+            cursor = await db.execute(_USERS_BY_IDS_SQL, (json.dumps(user_ids),))
             rows = await cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
 
     async def update_progress(
         self,
@@ -232,95 +551,122 @@ class DatabaseManager:
         status: str = "in_progress"
     ):
         """Обновить прогресс выгрузки"""
-        async with aiosqlite.connect(self.db_name) as db:
-            await db.execute("""
-                INSERT OR REPLACE INTO export_progress
-                (channel_id, channel_username, total_members,
-                 processed_members, last_user_id, status,
-                 created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?,
-                        COALESCE((SELECT created_at FROM export_progress WHERE channel_id = ?), ?),
-                        ?)
-            """, (channel_id, channel_username, total, processed,
-                  last_user_id, status, channel_id, datetime.now().isoformat(),
-                  datetime.now().isoformat()))
-
-            await db.commit()
+        now = datetime.now().isoformat()
+        async with self._immediate_transaction() as db:
+            await db.execute(_UPSERT_PROGRESS_SQL, (
+                channel_id, channel_username, total, processed,
+                last_user_id, status, now, now
+            ))
 
     async def get_progress(self, channel_id: int) -> Optional[Dict]:
         """Получить прогресс выгрузки"""
-        async with aiosqlite.connect(self.db_name) as db:
+        async with self._locked_connection() as db:
             cursor = await db.execute("""
                 SELECT * FROM export_progress WHERE channel_id = ?
             """, (channel_id,))
-
             row = await cursor.fetchone()
-            if row:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, row))
-            return None
+
+        if row:
+            columns = [desc[0] for desc in cursor.description]
+            return dict(zip(columns, row))
+        return None
 
     async def mark_users_as_deleted(self, user_ids: List[int], reason: str = "Deleted Account"):
         """Пометить пользователей как удаленные"""
         if not user_ids:
             return
 
-        async with aiosqlite.connect(self.db_name) as db:
+        ids_param = json.dumps(user_ids)
+        # Перенос и удаление выполняются одной транзакцией. DELETE ... RETURNING
+        # нельзя использовать как подзапрос INSERT, а возврат строк в Python и
+        # обратная вставка медленнее двух выражений внутри SQLite
+        async with self._immediate_transaction() as db:
             # Сначала перемещаем в таблицу deleted_users
-            placeholders = ','.join(['?' for _ in user_ids])
-            await db.execute(f"""
-                INSERT OR IGNORE INTO deleted_users
-                (id, access_hash, username, first_name, last_name,
-                 photo_id, bot, status, last_online, channel_id, channel_username,
-                 deletion_reason, found_at)
-                SELECT id, access_hash, username, first_name, last_name,
-                       photo_id, bot, status, last_online, channel_id, channel_username,
-                       ?, ?
-                FROM users
-                WHERE id IN ({placeholders})
-            """, (reason, datetime.now().isoformat(), *user_ids))
+            await db.execute(_MOVE_TO_DELETED_SQL, (reason, datetime.now().isoformat(), ids_param))
 
             # Затем удаляем из основной таблицы
-            await db.execute(f"""
-                DELETE FROM users WHERE id IN ({placeholders})
-            """, user_ids)
-
-            await db.commit()
+            await db.execute(_DELETE_USERS_SQL, (ids_param,))
 
     async def log_deletion(self, user_id: int, username: str, status: str, error: str = None):
         """Залогировать операцию удаления"""
-        async with aiosqlite.connect(self.db_name) as db:
-            await db.execute("""
-                INSERT INTO deletion_log
-                (user_id, username, deletion_time, status, error_message)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, username, datetime.now().isoformat(), status, error))
+        await self.log_deletions_batch([
+            (user_id, username, datetime.now().isoformat(), status, error)
+        ])
+
+    async def log_deletions_batch(self, rows: List[tuple]):
+        """
+        Пакетно залогировать операции удаления
+
+        Args:
+            rows: Кортежи (user_id, username, deletion_time, status, error_message)
+        """
+        if not rows:
+            return
 
-            await db.commit()
+        async with self._immediate_transaction() as db:
+            await db.executemany(_INSERT_DELETION_LOG_SQL, rows)
 
     async def get_deletion_stats(self) -> Dict:
         """Получить статистику удалений"""
-        async with aiosqlite.connect(self.db_name) as db:
-            cursor = await db.execute("""
+        async with self._locked_connection() as db:
+            async with db.execute(f"SELECT {_DELETION_STATS_COLUMNS} FROM deletion_log") as cursor:
+                return _deletion_stats(await cursor.fetchone())
+
+    async def get_report_header_stats(self, channel_id: Optional[int] = None) -> Dict:
+        """
+        Сводные числа для отчетов одним запросом
+
+        Результат переиспользуется _HEADER_STATS_TTL секунд, пока в базу
+        ничего не записывалось (сводка и следующий за ней отчет).
+
+        Returns:
+            total_users, deleted_accounts (кандидаты в удаленные), deleted_named
+            (из них с именем, начинающимся с "deleted") и deletion_stats
+        """
+        cached = self._header_stats_cache.get(channel_id)
+        if cached is not None and time.monotonic() - cached[0] < _HEADER_STATS_TTL:
+            return cached[1]
+
+        channel_filter = " AND channel_id = ?" if channel_id else ""
+        params = [channel_id] * 3 if channel_id else []
+
+        async with self._locked_connection() as db:
+            async with db.execute(f"""
                 SELECT
-                    COUNT(*) as total,
-                    COUNT(CASE WHEN status = 'success' THEN 1 END) as successful,
-                    COUNT(CASE WHEN status = 'error' THEN 1 END) as failed,
-                    COUNT(CASE WHEN error_message IS NOT NULL THEN 1 END) as with_errors
+                    (SELECT COUNT(*) FROM users WHERE 1 = 1{channel_filter}),
+                    (SELECT COUNT(*) FROM users WHERE is_deleted_candidate = 1{channel_filter}),
+                    (SELECT COUNT(*) FROM users
+                     WHERE is_deleted_candidate = 1{channel_filter} AND first_name LIKE 'deleted%'),
+                    {_DELETION_STATS_COLUMNS}
                 FROM deletion_log
-            """)
-
-            result = await cursor.fetchone()
-            if result:
-                return {
-                    'total': result[0],
-                    'successful': result[1],
-                    'failed': result[2],
-                    'with_errors': result[3]
-                }
-            return {'total': 0, 'successful': 0, 'failed': 0, 'with_errors': 0}
+            """, params) as cursor:
+                row = await cursor.fetchone()
+
+        stats = {
+            'total_users': row[0],
+            'deleted_accounts': row[1],
+            'deleted_named': row[2],
+            'deletion_stats': _deletion_stats(row[3:]),
+        }
+        self._header_stats_cache[channel_id] = (time.monotonic(), stats)
+        return stats
 
     async def close(self):
         """Закрыть соединение с базой данных"""
-        if self.connection:
-            await self.connection.close()
+        try:
+            await self.stop_writer()
+        finally:
+            await self._close_connection()
+
+    async def _close_connection(self):
+        """Закрыть общее соединение"""
+        if self.connection is not None:
+            # Дождаться незавершенных чтений и транзакций на этом соединении
+            async with self._lock:
+                connection, self.connection = self.connection, None
+            try:
+                # Ограниченный по времени анализ изменившихся таблиц перед закрытием
+                await connection.execute("PRAGMA analysis_limit=400")
+                await connection.execute("PRAGMA optimize")
+            finally:
+                await connection.close()
@@ -1,35 +1,97 @@
 import asyncio
-from typing import List, Dict, Optional, Callable
+import csv
+import json
+from typing import List, Dict, Optional, Callable, Awaitable
 from telethon import TelegramClient
+from telethon.errors import FloodWaitError
 from telethon.tl import functions
-from tqdm.asyncio import tqdm
+from tqdm import tqdm
 import time
 from datetime import datetime
 
 from .config import config
 from .database import DatabaseManager
 from .analyzer import DeletionCandidate, DeletionReason
-from .checkpoint_manager import CheckpointManager, Checkpoint
+from .checkpoint_manager import CheckpointManager, Checkpoint, channel_key
+from .console import ainput
+from .rate_limiter import TokenBucket
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него используется стандартный json
+    orjson = None
+
+_CSV_HEADER = ['ID', 'Username', 'First Name', 'Last Name', 'Reason', 'Confidence']
+
+
+def _candidate_to_row(candidate: DeletionCandidate) -> list:
+    """Строка CSV для кандидата"""
+    return [
+        candidate.user_id,
+        candidate.username or '',
+        candidate.first_name or '',
+        candidate.last_name or '',
+        candidate.reason.value,
+        f"{candidate.confidence:.2f}"
+    ]
+
+
+def _candidate_to_dict(candidate: DeletionCandidate) -> dict:
+    """Запись JSON для кандидата"""
+    return {
+        'id': candidate.user_id,
+        'username': candidate.username,
+        'first_name': candidate.first_name,
+        'last_name': candidate.last_name,
+        'reason': candidate.reason.value,
+        'confidence': candidate.confidence,
+        'details': candidate.details_dict
+    }
+
+
+def _write_candidates(candidates: List[DeletionCandidate], filename: str, format: str):
+    """Синхронно записать кандидатов в CSV или JSON"""
+    if format == 'csv':
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(_CSV_HEADER)
+            writer.writerows(map(_candidate_to_row, candidates))
+    elif format == 'json':
+        data = [_candidate_to_dict(candidate) for candidate in candidates]
+        if orjson is not None:
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
 
 
 class TelegramUserDeleter:
     """Класс для безопасного удаления пользователей из канала"""
 
-    def __init__(self, client: TelegramClient, db_manager: DatabaseManager):
+    def __init__(
+        self,
+        client: TelegramClient,
+        db_manager: DatabaseManager,
+        checkpoint_manager: Optional[CheckpointManager] = None
+    ):
         self.client = client
         self.db = db_manager
-        self.checkpoint_manager = CheckpointManager()
+        self.checkpoint_manager = checkpoint_manager if checkpoint_manager is not None else CheckpointManager()
         self.deleted_count = 0
         self.error_count = 0
         self.start_time = None
-        self.last_request_time = 0
+        self.rate_limiter = TokenBucket.from_delay(config.delete_delay)
+        # Записи журнала удалений, ожидающие пакетной записи в базу
+        self._log_buffer: List[tuple] = []
+        # Кандидаты, которых уже нет в канале, для передачи в on_deleted
+        self._removed: List[DeletionCandidate] = []
+        # Разрешенные entity каналов по имени (повторный запуск и возобновление без RPC)
+        self._channel_entities: Dict[str, object] = {}
 
     async def rate_limit(self):
         """Управление лимитом запросов"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < config.delete_delay:
-            await asyncio.sleep(config.delete_delay - elapsed)
-        self.last_request_time = time.time()
+        await self.rate_limiter.acquire()
 
     async def preview_deletions(self, candidates: List[DeletionCandidate], limit: int = 20):
         """
@@ -50,7 +112,7 @@ class TelegramUserDeleter:
         print("-"*60)
 
         for i, candidate in enumerate(candidates[:limit]):
-            status_emoji = "🤖" if candidate.details.get('bot') else "👤"
+            status_emoji = "🤖" if candidate.is_bot else "👤"
             print(f"{i+1}. {status_emoji} ID: {candidate.user_id}")
             print(f"   Имя: {candidate.first_name or 'Нет'} {candidate.last_name or ''}")
             print(f"   Username: @{candidate.username}" if candidate.username else "   Username: Нет")
@@ -91,7 +153,7 @@ class TelegramUserDeleter:
         print("="*50)
 
         while True:
-            response = input("\nУдалить этих пользователей? (yes/no/preview): ").lower().strip()
+            response = (await ainput("\nУдалить этих пользователей? (yes/no/preview): ")).lower().strip()
 
             if response in ['yes', 'y', 'да']:
                 return True
@@ -110,7 +172,8 @@ class TelegramUserDeleter:
         candidates: List[DeletionCandidate],
         batch_size: Optional[int] = None,
         checkpoint_interval: int = 100,
-        resume: bool = False
+        resume: bool = False,
+        on_deleted: Optional[Callable[[List[DeletionCandidate]], Awaitable[None]]] = None
     ) -> Dict:
         """
         Удалить пользователей из канала
@@ -121,6 +184,8 @@ class TelegramUserDeleter:
             batch_size: Размер пакета для удаления
             checkpoint_interval: Частота сохранения чекпоинтов
             resume: Возобновить с последнего чекпоинта
+            on_deleted: Вызывается после каждого пакета с кандидатами, которых уже
+                нет в канале; выполняется параллельно с удалением следующего пакета
 
         Returns:
             Статистика удаления
@@ -128,8 +193,9 @@ class TelegramUserDeleter:
         if not candidates:
             return {'deleted': 0, 'errors': 0, 'total': 0}
 
-        # Проверяем права администратора
-        if not await self._check_admin_rights(channel_username):
+        # Проверяем права администратора (заодно получаем entity канала)
+        channel = await self._check_admin_rights(channel_username)
+        if channel is None:
             raise PermissionError("Недостаточно прав для удаления пользователей")
 
         # Показываем предпросмотр
@@ -141,7 +207,7 @@ class TelegramUserDeleter:
 
         # Возобновление с чекпоинта
         if resume:
-            checkpoint = self.checkpoint_manager.load_latest_checkpoint('delete', hash(channel_username))
+            checkpoint = self.checkpoint_manager.load_latest_checkpoint('delete', channel_key(channel_username))
             if checkpoint:
                 start_index = checkpoint.processed_items
                 print(f"Возобновление с позиции: {start_index}")
@@ -150,7 +216,7 @@ class TelegramUserDeleter:
                 print("Чекпоинт не найден, начинаем сначала")
 
         batch_size = batch_size or config.delete_batch_size
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
 
         print(f"\nНАЧАЛО УДАЛЕНИЯ")
         print(f"Канал: {channel_username}")
@@ -162,24 +228,35 @@ class TelegramUserDeleter:
         pbar = tqdm(
             total=len(candidates),
             desc="Удаление пользователей",
-            unit="пользователей"
+            unit="пользователей",
+            # Перерисовка не чаще раза в секунду, без сглаживания скорости
+            mininterval=1.0,
+            smoothing=0
         )
 
-        try:
-            # Получаем entity канала
-            channel = await self.client.get_entity(channel_username)
+        # Обработка удаленных предыдущего пакета (не больше одной одновременно)
+        removed_task: Optional[asyncio.Task] = None
 
+        try:
             # Обрабатываем пачками
             for i in range(0, len(candidates), batch_size):
                 batch = candidates[i:i + batch_size]
                 await self._delete_batch(channel, batch, i)
+                await self._flush_deletion_log()
+
+                if removed_task is not None:
+                    task, removed_task = removed_task, None
+                    await task
+                if on_deleted is not None and self._removed:
+                    removed, self._removed = self._removed, []
+                    removed_task = asyncio.create_task(on_deleted(removed))
 
                 # Обновляем прогресс
                 pbar.update(len(batch))
 
                 # Сохраняем чекпоинт
                 if (i + len(batch)) % checkpoint_interval == 0:
-                    await self._save_checkpoint('delete', hash(channel_username), i + len(batch), len(candidates), channel_username)
+                    await self._save_checkpoint('delete', channel_key(channel_username), i + len(batch), len(candidates), channel_username)
 
                 # Небольшая пауза между пакетами
                 await asyncio.sleep(0.5)
@@ -188,14 +265,24 @@ class TelegramUserDeleter:
             print("\n\nУдаление прервано пользователем")
             # Сохраняем текущий прогресс
             if self.deleted_count > 0:
-                await self._save_checkpoint('delete', hash(channel_username), self.deleted_count, len(candidates), channel_username)
+                await self._save_checkpoint('delete', channel_key(channel_username), self.deleted_count, len(candidates), channel_username)
         except Exception as e:
             print(f"\n\nОшибка во время удаления: {e}")
         finally:
             pbar.close()
+            await self._flush_deletion_log()
+            try:
+                if removed_task is not None:
+                    await removed_task
+                # Удаленные в прерванном пакете тоже передаются обработчику
+                if on_deleted is not None and self._removed:
+                    removed, self._removed = self._removed, []
+                    await on_deleted(removed)
+            except Exception as e:
+                print(f"\nОшибка обработки удаленных пользователей: {e}")
 
         # Финальная статистика
-        elapsed_time = time.time() - self.start_time
+        elapsed_time = time.monotonic() - self.start_time
         stats = {
             'deleted': self.deleted_count,
             'errors': self.error_count,
@@ -209,65 +296,107 @@ class TelegramUserDeleter:
 
         # Удаляем чекпоинт после успешного завершения
         if stats['deleted'] == stats['total']:
-            self.checkpoint_manager.delete_checkpoint('delete', hash(channel_username))
+            self.checkpoint_manager.delete_checkpoint('delete', channel_key(channel_username))
 
         return stats
 
     async def _delete_batch(self, channel, batch: List[DeletionCandidate], batch_index: int):
         """Удалить пакет пользователей"""
-        for candidate in batch:
-            try:
-                await self.rate_limit()
-
-                # Удаляем участника
-                await self.client.kick_participant(
-                    channel,
-                    candidate.user_id
-                )
-
-                # Логируем успешное удаление
-                await self.db.log_deletion(
-                    candidate.user_id,
-                    candidate.username or '',
-                    'success',
-                    None
-                )
-
-                self.deleted_count += 1
+        # Запросы идут параллельно (не больше delete_concurrency одновременно),
+        # а темп по-прежнему задает rate_limit
+        semaphore = asyncio.Semaphore(config.delete_concurrency)
+        try:
+            async with asyncio.TaskGroup() as group:
+                for candidate in batch:
+                    group.create_task(self._kick_one(channel, candidate, semaphore))
+        except ExceptionGroup as eg:
+            # Остальные удаления пакета уже отменены, наружу уходит исходная ошибка
+            raise eg.exceptions[0]
+
+    async def _kick_one(self, channel, candidate: DeletionCandidate, semaphore: asyncio.Semaphore):
+        """Удалить одного участника с учетом FloodWait"""
+        async with semaphore:
+            for attempt in range(config.max_retries + 1):
+                try:
+                    await self.rate_limit()
+
+                    # Удаляем участника
+                    await self.client.kick_participant(
+                        channel,
+                        candidate.user_id
+                    )
+
+                    # Логируем успешное удаление
+                    self._log_deletion(candidate, 'success')
 
-            except Exception as e:
-                self.error_count += 1
-                error_msg = str(e)
-
-                # Логируем ошибку
-                await self.db.log_deletion(
-                    candidate.user_id,
-                    candidate.username or '',
-                    'error',
-                    error_msg
-                )
-
-                # Пропускаем некоторые типы ошибок
-                if "CHANNEL_PRIVATE" in error_msg:
-                    print(f"\nОшибка: канал стал приватным или вы были удалены из него")
-                    raise
-                elif "USER_ADMIN_INVALID" in error_msg:
-                    print(f"\nОшибка: недостаточно прав для удаления пользователя {candidate.user_id}")
-                elif "USER_NOT_PARTICIPANT" in error_msg:
-                    # Пользователь уже не в канале
                     self.deleted_count += 1
-                # Другие ошибки логируем, но продолжаем
+                    self._removed.append(candidate)
+                    return
+
+                except FloodWaitError as e:
+                    # Ждем столько, сколько попросил сервер, и повторяем
+                    self.rate_limiter.pause(e.seconds)
+                    if attempt < config.max_retries:
+                        continue
+                    self.error_count += 1
+                    self._log_deletion(candidate, 'error', str(e))
+                    return
+
+                except Exception as e:
+                    self.error_count += 1
+                    error_msg = str(e)
+
+                    # Логируем ошибку
+                    self._log_deletion(candidate, 'error', error_msg)
+
+                    # Пропускаем некоторые типы ошибок
+                    if "CHANNEL_PRIVATE" in error_msg:
+                        print(f"\nОшибка: канал стал приватным или вы были удалены из него")
+                        raise
+                    elif "USER_ADMIN_INVALID" in error_msg:
+                        print(f"\nОшибка: недостаточно прав для удаления пользователя {candidate.user_id}")
+                    elif "USER_NOT_PARTICIPANT" in error_msg:
+                        # Пользователь уже не в канале
+                        self.deleted_count += 1
+                        self._removed.append(candidate)
+                    # Другие ошибки логируем, но продолжаем
+                    return
+
+    def _log_deletion(self, candidate: DeletionCandidate, status: str, error: Optional[str] = None):
+        """Добавить запись о попытке удаления в буфер журнала"""
+        self._log_buffer.append((
+            candidate.user_id,
+            candidate.username or '',
+            datetime.now().isoformat(),
+            status,
+            error
+        ))
+
+    async def _flush_deletion_log(self):
+        """Записать накопленный журнал удалений одной транзакцией"""
+        if not self._log_buffer:
+            return
+        rows, self._log_buffer = self._log_buffer, []
+        await self.db.log_deletions_batch(rows)
+
+    async def _get_channel(self, channel_username: str):
+        """Получить entity канала, разрешая имя только один раз"""
+        channel = self._channel_entities.get(channel_username)
+        if channel is None:
+            channel = await self.client.get_entity(channel_username)
+            self._channel_entities[channel_username] = channel
+        return channel
 
-    async def _check_admin_rights(self, channel_username: str) -> bool:
-        """Проверить права администратора в канале"""
+    async def _check_admin_rights(self, channel_username: str):
+        """Проверить права администратора в канале; возвращает entity канала или None"""
         try:
-            channel = await self.client.get_entity(channel_username)
+            channel = await self._get_channel(channel_username)
             # Проверяем, можем ли мы получить информацию о канале
-            full_channel = await self.client(functions.channels.GetFullChannelRequest(channel))
-            return True
+            await self.client(functions.channels.GetFullChannelRequest(channel))
+            return channel
         except Exception as e:
             print(f"Ошибка проверки прав: {e}")
-            return False
+            return None
 
     async def _save_checkpoint(
         self,
@@ -287,10 +416,10 @@ class TelegramUserDeleter:
             metadata={
                 'deleted_count': self.deleted_count,
                 'error_count': self.error_count,
-                'elapsed_time': time.time() - self.start_time if self.start_time else 0
+                'elapsed_time': time.monotonic() - self.start_time if self.start_time else 0
             }
         )
-        self.checkpoint_manager.save_checkpoint(checkpoint)
+        await self.checkpoint_manager.save_checkpoint_async(checkpoint)
 
     async def _print_deletion_summary(self, stats: Dict):
         """Вывести сводку по удалению"""
@@ -331,36 +460,6 @@ class TelegramUserDeleter:
         format: str = 'csv'
     ):
         """Экспортировать кандидатов в файл"""
-        import csv
-        import json
-
-        if format.lower() == 'csv':
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['ID', 'Username', 'First Name', 'Last Name', 'Reason', 'Confidence'])
-                for candidate in candidates:
-                    writer.writerow([
-                        candidate.user_id,
-                        candidate.username or '',
-                        candidate.first_name or '',
-                        candidate.last_name or '',
-                        candidate.reason.value,
-                        f"{candidate.confidence:.2f}"
-                    ])
-        elif format.lower() == 'json':
-            data = []
-            for candidate in candidates:
-                data.append({
-                    'id': candidate.user_id,
-                    'username': candidate.username,
-                    'first_name': candidate.first_name,
-                    'last_name': candidate.last_name,
-                    'reason': candidate.reason.value,
-                    'confidence': candidate.confidence,
-                    'details': candidate.details
-                })
-
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-
+        # Запись выполняется в отдельном потоке, чтобы не останавливать цикл событий
+        await asyncio.to_thread(_write_candidates, candidates, filename, format.lower())
         print(f"Кандидаты экспортированы в файл: {filename}")
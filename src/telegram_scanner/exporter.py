@@ -1,13 +1,43 @@
 import asyncio
-from typing import List, Optional, AsyncGenerator
+import random
+from collections import deque
+from typing import List, AsyncGenerator, Deque, Dict, Tuple
 from telethon import TelegramClient
+from telethon.errors import FloodWaitError
 from telethon.tl import functions, types
-from tqdm.asyncio import tqdm
+from tqdm import tqdm
 import time
-from datetime import datetime
 
 from .config import config
 from .database import DatabaseManager, User
+from .rate_limiter import TokenBucket
+
+
+# Имена статусов Telethon; строки-константы общие для всех пользователей пачки
+_STATUS_NAMES = {
+    types.UserStatusOnline: 'online',
+    types.UserStatusOffline: 'offline',
+    types.UserStatusRecently: 'recently',
+    types.UserStatusLastWeek: 'last_week',
+    types.UserStatusLastMonth: 'last_month',
+}
+
+# Сколько загруженных страниц может ждать записи в базу
+_PIPELINE_QUEUE_SIZE = 4
+
+# Сколько секунд считается актуальным закэшированное число участников канала
+_MEMBERS_COUNT_TTL = 300.0
+
+# Повторы запроса страницы: экспоненциальная пауза со случайной добавкой,
+# после _FETCH_MAX_FAILURES неудач подряд выгрузка завершается с ошибкой
+_RETRY_BASE_DELAY = 1.0
+_RETRY_MAX_DELAY = 60.0
+_FETCH_MAX_FAILURES = 6
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Пауза перед повтором после attempt неудачных попыток подряд"""
+    return min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * (2 ** attempt + random.random()))
 
 
 class TelegramExporter:
@@ -19,34 +49,48 @@ class TelegramExporter:
         self.exported_count = 0
         self.error_count = 0
         self.start_time = None
-        self.last_request_time = 0
         self._status = "in_progress"
+        self._last_user_id = None
+        # Общий ограничитель для всех параллельных запросов страниц; после простоя
+        # допускается не больше export_concurrency запросов подряд
+        self.rate_limiter = TokenBucket.from_delay(config.request_delay, capacity=max(1, config.export_concurrency))
+        # Сущности каналов по нормализованному имени и число участников по id канала
+        # с временем получения: повторная выгрузка и анализ не обращаются к серверу
+        self._entity_cache: Dict[str, types.Channel] = {}
+        self._count_cache: Dict[int, Tuple[float, int]] = {}
 
     async def rate_limit(self):
         """Управление лимитом запросов"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < config.request_delay:
-            await asyncio.sleep(config.request_delay - elapsed)
-        self.last_request_time = time.time()
+        await self.rate_limiter.acquire()
 
     async def get_channel_info(self, channel_username: str) -> types.Channel:
-        """Получить информацию о канале"""
+        """Получить информацию о канале (результат кэшируется на время работы)"""
+        key = channel_username.lstrip('@').lower()
+        cached = self._entity_cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
             entity = await self.client.get_entity(channel_username)
-            if isinstance(entity, types.Channel):
-                return entity
             # Для тестов/заглушек допускаем объекты с полем id
-            if hasattr(entity, "id"):
+            if isinstance(entity, types.Channel) or hasattr(entity, "id"):
+                self._entity_cache[key] = entity
                 return entity
             raise ValueError(f"Entity {channel_username} не является каналом")
         except Exception as e:
             raise ValueError(f"Не удалось получить информацию о канале {channel_username}: {e}")
 
     async def get_total_members_count(self, channel: types.Channel) -> int:
-        """Получить общее количество участников канала"""
+        """Получить общее количество участников канала (кэшируется на _MEMBERS_COUNT_TTL секунд)"""
+        cached = self._count_cache.get(channel.id)
+        if cached is not None and time.monotonic() - cached[0] < _MEMBERS_COUNT_TTL:
+            return cached[1]
+
         try:
             full_chat = await self.client(functions.channels.GetFullChannelRequest(channel))
-            return full_chat.full_chat.participants_count or 0
+            count = full_chat.full_chat.participants_count or 0
+            self._count_cache[channel.id] = (time.monotonic(), count)
+            return count
         except Exception as e:
             print(f"Не удалось получить количество участников: {e}")
             return 0
@@ -72,52 +116,42 @@ class TelegramExporter:
         total_members = await self.get_total_members_count(channel)
         print(f"Общее количество участников: {total_members:,}".replace(',', ' '))
 
+        # Экспортер переиспользуется между запусками: счетчики и статус
+        # предыдущей выгрузки не должны влиять на новую
+        self.exported_count = 0
+        self.error_count = 0
+        self._status = "in_progress"
+        self._last_user_id = None
+
         # Проверяем возможность возобновления
-        last_user_id = None
+        start_offset = 0
         if resume:
             progress = await self.db.get_progress(channel_id)
             if progress and progress['status'] == 'in_progress':
-                self.exported_count = progress['processed_members']
-                last_user_id = progress['last_user_id']
-                print(f"Возобновление с позиции: {self.exported_count:,} участников")
+                start_offset = progress['processed_members']
+                self.exported_count = start_offset
+                print(f"Возобновление с позиции: {start_offset:,} участников".replace(',', ' '))
 
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
 
         # Инициализация прогресс-бара
-        if resume:
-            initial_value = self.exported_count
-        else:
-            initial_value = 0
-
         pbar = tqdm(
             total=total_members,
-            initial=initial_value,
+            initial=start_offset,
             desc="Экспорт участников",
             unit="участников",
-            dynamic_ncols=True
+            dynamic_ncols=True,
+            # Перерисовка не чаще раза в секунду, без сглаживания скорости
+            mininterval=1.0,
+            smoothing=0
         )
 
-        try:
-            # Собираем всех участников
-            async for user_batch in self._get_participants_batch(channel, last_user_id):
-                # Сохраняем в базу данных
-                saved_count = await self.db.insert_users_batch(
-                    user_batch, channel_id, channel_username
-                )
-                self.exported_count += saved_count
-
-                # Обновляем прогресс в базе данных
-                if self.exported_count % config.checkpoint_interval == 0:
-                    await self.db.update_progress(
-                        channel_id, channel_username,
-                        self.exported_count, total_members,
-                        user_batch[-1].id if user_batch else None
-                    )
-                    print(f"\nСохранен прогресс: {self.exported_count:,} участников")
-
-                # Обновляем прогресс-бар
-                pbar.update(len(user_batch))
+        # Запись в базу идет в фоне, параллельно с запросами к Telegram
+        await self.db.start_writer()
 
+        try:
+            # Уже выгруженные участники пропускаются на стороне сервера через offset
+            await self._export_pipeline(channel, channel_username, total_members, start_offset, pbar)
         except KeyboardInterrupt:
             print("\n\nЭкспорт прерван пользователем")
             self._status = "cancelled"
@@ -127,6 +161,12 @@ class TelegramExporter:
         finally:
             pbar.close()
 
+        try:
+            await self.db.stop_writer()
+        except Exception as e:
+            print(f"\n\nОшибка записи в базу данных: {e}")
+            self._status = "error"
+
         # Финальное обновление прогресса
         if self._status == "in_progress":
             self._status = "completed"
@@ -137,8 +177,12 @@ class TelegramExporter:
             status=self._status
         )
 
+        # После полной выгрузки у планировщика должна быть статистика по индексам
+        if self._status == "completed":
+            await self.db.ensure_statistics()
+
         # Статистика
-        elapsed_time = time.time() - self.start_time
+        elapsed_time = time.monotonic() - self.start_time
         stats = {
             'exported': self.exported_count,
             'errors': self.error_count,
@@ -151,22 +195,104 @@ class TelegramExporter:
 
         return stats
 
-    async def _get_participants_batch(
-        self, channel: types.Channel, offset_user: Optional[int] = None
-    ) -> AsyncGenerator[List[User], None]:
+    async def _export_pipeline(
+        self,
+        channel: types.Channel,
+        channel_username: str,
+        total_members: int,
+        start_offset: int,
+        pbar: tqdm
+    ):
         """
-        Генератор пакетов участников канала
+        Выгрузка конвейером: следующая страница участников запрашивается,
+        пока предыдущие пачки сохраняются в базу
 
         Args:
             channel: Объект канала
-            offset_user: ID пользователя для начала (для возобновления)
-
-        Yields:
-            Списки объектов User
+            channel_username: Имя канала
+            total_members: Общее количество участников
+            start_offset: С какого по счету участника начинать (для возобновления)
+            pbar: Прогресс-бар экспорта
         """
-        offset = 0
-        batch_size = min(config.batch_size, 200)  # Telethon limit
+        # Ограниченная очередь: загрузка не убегает далеко вперед записи
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_PIPELINE_QUEUE_SIZE)
+
+        async def producer():
+            async for user_batch in self._get_participants_batch(channel, start_offset):
+                await queue.put(user_batch)
+            # Сигнал завершения для потребителя
+            await queue.put(None)
+
+        # Страницы копятся до batch_size пользователей и записываются одной пачкой
+        pending: List[User] = []
+        saved_progress = self.exported_count
+        # Сохранение прогресса идет в отдельной задаче и не задерживает прием страниц
+        progress_due = asyncio.Event()
+        finished = False
+
+        async def flush():
+            nonlocal pending
+            if not pending:
+                return
+            # Накопленный список целиком передается записи (фоновый писатель держит
+            # его в очереди), а страницы дальше копятся в новый - без копирования
+            batch, pending = pending, []
+            saved_count = await self.db.insert_users_batch(
+                batch, channel.id, channel_username
+            )
+            self._last_user_id = batch[-1].id
+            self.exported_count += saved_count
+            # Прогресс-бар обновляется раз на пачку, а не на каждую страницу
+            pbar.update(saved_count)
+
+            if self.exported_count - saved_progress >= config.checkpoint_interval:
+                progress_due.set()
+
+        async def checkpointer():
+            nonlocal saved_progress
+            while True:
+                await progress_due.wait()
+                progress_due.clear()
+                if finished:
+                    return
+                # Счетчик и последний id берутся вместе, до ожидания записи
+                exported_count, last_user_id = self.exported_count, self._last_user_id
+                # Прогресс сохраняется только после записи всех выгруженных пачек
+                await self.db.flush_writes()
+                await self.db.update_progress(
+                    channel.id, channel_username,
+                    exported_count, total_members,
+                    last_user_id
+                )
+                saved_progress = exported_count
+                print(f"\nСохранен прогресс: {exported_count:,} участников".replace(',', ' '))
 
+        async def consumer():
+            nonlocal finished
+            try:
+                while (user_batch := await queue.get()) is not None:
+                    pending.extend(user_batch)
+                    if len(pending) >= config.batch_size:
+                        await flush()
+            finally:
+                # Уже загруженные участники сохраняются и при остановке выгрузки
+                await flush()
+                # Итоговый прогресс записывает export_channel_participants
+                finished = True
+                progress_due.set()
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(producer())
+                group.create_task(consumer())
+                group.create_task(checkpointer())
+        except ExceptionGroup as eg:
+            # Остальные задачи уже отменены, наружу уходит исходная ошибка
+            raise eg.exceptions[0]
+
+    async def _fetch_participants_page(self, channel: types.Channel, offset: int, limit: int) -> list:
+        """Запросить одну страницу участников, повторяя запрос при ошибках"""
+        failures = 0
         while True:
             try:
                 await self.rate_limit()
@@ -176,71 +302,107 @@ class TelegramExporter:
                     channel=channel,
                     filter=types.ChannelParticipantsSearch(''),  # Все участники
                     offset=offset,
-                    limit=batch_size,
+                    limit=limit,
+                    # hash сервера считается только по id участников: аккаунт,
+                    # удаленный после прошлой выгрузки, его не меняет, и ответ
+                    # NotModified скрыл бы как раз те изменения, которые мы ищем
                     hash=0
                 )
 
                 result = await self.client(request)
+                return result.users
 
-                if not result.users:
-                    break
+            except FloodWaitError as e:
+                # Сервер сам указал паузу - она останавливает все запросы, не только этот;
+                # случайная добавка разводит повторы параллельных запросов
+                self.rate_limiter.pause(e.seconds + random.random())
 
-                # Преобразуем пользователей в объекты User
-                users = []
-                for user in result.users:
-                    # Если возобновляем и еще не дошли до нужного ID
-                    if offset_user and user.id <= offset_user:
-                        continue
-
-                    user_obj = User(
-                        id=user.id,
-                        access_hash=user.access_hash,
-                        username=user.username,
-                        first_name=user.first_name,
-                        last_name=user.last_name,
-                        photo_id=getattr(user.photo, "photo_id", None) if getattr(user, "photo", None) else None,
-                        bot=user.bot,
-                        verified=user.verified,
-                        restricted=user.restricted,
-                        premium=user.premium
-                    )
-
-                    # Определяем статус
-                    if hasattr(user, 'status') and user.status:
-                        if isinstance(user.status, types.UserStatusOnline):
-                            user_obj.status = 'online'
-                        elif isinstance(user.status, types.UserStatusOffline):
-                            user_obj.status = 'offline'
-                            user_obj.last_online = user.status.was_online
-                        elif isinstance(user.status, types.UserStatusRecently):
-                            user_obj.status = 'recently'
-                        elif isinstance(user.status, types.UserStatusLastWeek):
-                            user_obj.status = 'last_week'
-                        elif isinstance(user.status, types.UserStatusLastMonth):
-                            user_obj.status = 'last_month'
-                        else:
-                            user_obj.status = 'unknown'
-                    else:
-                        user_obj.status = 'unknown'
-
-                    users.append(user_obj)
-
-                if not users:
-                    break
+            except Exception as e:
+                self.error_count += 1
+                failures += 1
+                if failures >= _FETCH_MAX_FAILURES:
+                    raise
+                delay = _backoff_delay(failures - 1)
+                print(f"\nОшибка при получении пакета: {e}; повтор через {delay:.1f} сек")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _to_user(user) -> User:
+        """Преобразовать пользователя Telethon в объект User"""
+        # Статус определяется одним поиском по типу вместо цепочки isinstance
+        status = user.status
+        status_cls = type(status)
+        photo = user.photo
+
+        # Аргументы передаются позиционно в порядке полей User: для dataclass
+        # это заметно дешевле именованных при сотнях тысяч объектов
+        return User(
+            user.id,
+            user.access_hash,
+            user.username,
+            user.first_name,
+            user.last_name,
+            getattr(photo, "photo_id", None) if photo else None,
+            user.bot,
+            user.verified,
+            user.restricted,
+            _STATUS_NAMES.get(status_cls, 'unknown'),
+            status.was_online if status_cls is types.UserStatusOffline else None,
+            user.premium,
+        )
 
-                yield users
+    async def _get_participants_batch(
+        self, channel: types.Channel, start_offset: int = 0
+    ) -> AsyncGenerator[List[User], None]:
+        """
+        Генератор пакетов участников канала
 
-                # Проверяем, получили ли мы все участники
-                if len(result.users) < batch_size:
+        Одновременно запрашивается до export_concurrency страниц со
+        следующими смещениями; пакеты выдаются строго по порядку смещений.
+
+        Args:
+            channel: Объект канала
+            start_offset: Смещение первой страницы (для возобновления)
+
+        Yields:
+            Списки объектов User
+        """
+        batch_size = min(config.batch_size, 200)  # Telethon limit
+        to_user = self._to_user
+        next_offset = start_offset or 0
+        pending: Deque[asyncio.Task] = deque()
+
+        def schedule():
+            nonlocal next_offset
+            pending.append(asyncio.create_task(
+                self._fetch_participants_page(channel, next_offset, batch_size)
+            ))
+            next_offset += batch_size
+
+        try:
+            for _ in range(max(1, config.export_concurrency)):
+                schedule()
+
+            while pending:
+                page = await pending.popleft()
+                if not page:
                     break
 
-                offset += len(users)
+                # Проверяем, получили ли мы все участники
+                last_page = len(page) < batch_size
+                if not last_page:
+                    schedule()
 
-            except Exception as e:
-                self.error_count += 1
-                print(f"\nОшибка при получении пакета: {e}")
-                await asyncio.sleep(1)  # Пауза перед повторной попыткой
-                continue
+                # Преобразуем пользователей в объекты User
+                yield [to_user(user) for user in page]
+
+                if last_page:
+                    break
+        finally:
+            # Запросы за концом списка участников больше не нужны
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
 
     async def print_export_summary(self, stats: dict):
         """Вывести сводку по экспорту"""
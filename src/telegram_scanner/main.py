@@ -1,6 +1,8 @@
 import asyncio
 import sys
+from collections import defaultdict
 from pathlib import Path
+from typing import Dict, List
 
 from telethon import TelegramClient
 from telethon.errors import SessionPasswordNeededError, ApiIdInvalidError
@@ -8,10 +10,11 @@ from telethon.errors import SessionPasswordNeededError, ApiIdInvalidError
 from .config import config
 from .database import DatabaseManager
 from .exporter import TelegramExporter
-from .analyzer import DeletedUserAnalyzer
+from .analyzer import DeletedUserAnalyzer, DeletionCandidate
 from .deleter import TelegramUserDeleter
 from .reporter import ReportGenerator
 from .checkpoint_manager import CheckpointManager
+from .console import ainput
 
 
 class TelegramScannerApp:
@@ -27,10 +30,10 @@ class TelegramScannerApp:
         self.checkpoint_manager = None
 
     @staticmethod
-    def _safe_input(prompt: str) -> str | None:
+    async def _safe_input(prompt: str) -> str | None:
         """Безопасный ввод с обработкой отсутствия stdin"""
         try:
-            return input(prompt)
+            return await ainput(prompt)
         except EOFError:
             print("Ввод недоступен. Запустите скрипт в интерактивном терминале и попробуйте снова.")
             return None
@@ -48,10 +51,14 @@ class TelegramScannerApp:
         config.print_config()
 
         # Инициализация клиента Telegram
+        # Короткие FloodWait Telethon пережидает сам внутри запроса; более длинные
+        # доходят до общего ограничителя и останавливают все параллельные запросы.
+        # Соединение держит живым пинг самого Telethon, переподключение включено
         self.client = TelegramClient(
             config.session_name,
             config.api_id,
-            config.api_hash
+            config.api_hash,
+            flood_sleep_threshold=config.flood_sleep_threshold
         )
 
         # Инициализация менеджера базы данных
@@ -61,9 +68,9 @@ class TelegramScannerApp:
         # Инициализация остальных компонентов
         self.exporter = TelegramExporter(self.client, self.db_manager)
         self.analyzer = DeletedUserAnalyzer(self.db_manager)
-        self.deleter = TelegramUserDeleter(self.client, self.db_manager)
-        self.reporter = ReportGenerator(self.db_manager)
         self.checkpoint_manager = CheckpointManager()
+        self.deleter = TelegramUserDeleter(self.client, self.db_manager, self.checkpoint_manager)
+        self.reporter = ReportGenerator(self.db_manager)
 
         print("Инициализация завершена.")
         return True
@@ -76,13 +83,13 @@ class TelegramScannerApp:
             if not await self.client.is_user_authorized():
                 print("Отправка кода запроса...")
                 phone_code = await self.client.send_code_request(config.phone_number)
-                code = self._safe_input("Введите код из Telegram: ")
+                code = await self._safe_input("Введите код из Telegram: ")
                 if not code:
                     return False
                 try:
                     await self.client.sign_in(config.phone_number, code)
                 except SessionPasswordNeededError:
-                    password = self._safe_input("Двухфакторная аутентификация. Введите пароль: ")
+                    password = await self._safe_input("Двухфакторная аутентификация. Введите пароль: ")
                     if not password:
                         return False
                     await self.client.sign_in(password=password)
@@ -111,7 +118,7 @@ class TelegramScannerApp:
             print("0. Выход")
             print("-"*50)
 
-            choice = input("Выберите действие: ").strip()
+            choice = (await ainput("Выберите действие: ")).strip()
 
             if choice == "1":
                 await self.export_channel_menu()
@@ -135,15 +142,21 @@ class TelegramScannerApp:
 
     async def export_channel_menu(self):
         """Меню экспорта участников"""
-        channel_username = input("Введите имя канала (например, @channel_name): ").strip()
+        channel_username = (await ainput("Введите имя канала (например, @channel_name): ")).strip()
 
         if not channel_username.startswith('@'):
             channel_username = '@' + channel_username
 
-        # Проверяем наличие чекпоинтов
-        checkpoint = self.checkpoint_manager.load_latest_checkpoint('export', hash(channel_username))
-        if checkpoint:
-            resume = input(f"Найден незавершенный экспорт ({checkpoint.processed_items:,} / {checkpoint.total_items:,}). Возобновить? (y/n): ").lower()
+        # Незавершенная выгрузка ищется по прогрессу в базе - по нему же и
+        # возобновляется экспорт; сущность канала кэшируется экспортером
+        try:
+            channel = await self.exporter.get_channel_info(channel_username)
+            progress = await self.db_manager.get_progress(channel.id)
+        except ValueError:
+            # Ошибку доступа к каналу покажет сам экспорт
+            progress = None
+        if progress and progress['status'] == 'in_progress':
+            resume = (await ainput(f"Найден незавершенный экспорт ({progress['processed_members']:,} / {progress['total_members']:,}). Возобновить? (y/n): ")).lower()
             if resume == 'y':
                 await self.export_channel(channel_username, resume=True)
                 return
@@ -157,7 +170,7 @@ class TelegramScannerApp:
             await self.exporter.print_export_summary(stats)
 
             # Автоматически запускаем анализ после экспорта
-            analyze = input("\nЗапустить анализ удаленных аккаунтов? (y/n): ").lower()
+            analyze = (await ainput("\nЗапустить анализ удаленных аккаунтов? (y/n): ")).lower()
             if analyze == 'y':
                 await self.analyze_deleted_users(stats['channel_id'], channel_username)
 
@@ -166,13 +179,18 @@ class TelegramScannerApp:
 
     async def analyze_menu(self):
         """Меню анализа"""
-        channel_username = input("Введите имя канала (или Enter для анализа всех): ").strip()
+        channel_username = (await ainput("Введите имя канала (или Enter для анализа всех): ")).strip()
 
         channel_id = None
         if channel_username:
             if not channel_username.startswith('@'):
                 channel_username = '@' + channel_username
-            # Здесь можно получить ID канала через client.get_entity
+            # ID канала нужен только для фильтра; сущность кэшируется экспортером
+            try:
+                channel_id = (await self.exporter.get_channel_info(channel_username)).id
+            except ValueError as e:
+                print(e)
+                return
         else:
             # Показываем список каналов в БД
             # Для простоты анализируем все
@@ -189,7 +207,7 @@ class TelegramScannerApp:
             self.analyzer.print_candidates_summary(candidates)
 
             # Сохраняем кандидатов
-            save = input("\nСохранить список кандидатов? (y/n): ").lower()
+            save = (await ainput("\nСохранить список кандидатов? (y/n): ")).lower()
             if save == 'y':
                 files = await self.reporter.generate_candidates_report(
                     candidates,
@@ -198,28 +216,29 @@ class TelegramScannerApp:
                 print(f"Сохранено в: {', '.join(files.values())}")
 
             # Предлагаем удалить
-            delete = input("\nУдалить найденные аккаунты? (y/n): ").lower()
+            delete = (await ainput("\nУдалить найденные аккаунты? (y/n): ")).lower()
             if delete == 'y':
-                # Получаем entity канала
-                channel_entity = await self.client.get_entity(channel_username)
-                channel_id = channel_entity.id
-
-                stats = await self.deleter.delete_users(channel_username, candidates)
-                if not stats.get('cancelled'):
-                    await self.db_manager.mark_users_as_deleted(
-                        [c.user_id for c in candidates],
-                        reason=candidates[0].reason.value if candidates else "Deleted Account"
-                    )
+                await self.deleter.delete_users(
+                    channel_username, candidates, on_deleted=self._mark_users_as_deleted
+                )
         else:
             print("Удаленные аккаунты не найдены")
 
+    async def _mark_users_as_deleted(self, candidates: List[DeletionCandidate]):
+        """Перенести удаленных из канала пользователей в deleted_users (по причинам)"""
+        by_reason: Dict[str, List[int]] = defaultdict(list)
+        for candidate in candidates:
+            by_reason[candidate.reason.value].append(candidate.user_id)
+        for reason, user_ids in by_reason.items():
+            await self.db_manager.mark_users_as_deleted(user_ids, reason=reason)
+
     async def show_statistics(self):
         """Показать статистику"""
         await self.reporter.print_summary_report()
 
     async def delete_users_menu(self):
         """Меню удаления пользователей"""
-        channel_username = input("Введите имя канала: ").strip()
+        channel_username = (await ainput("Введите имя канала: ")).strip()
         if not channel_username.startswith('@'):
             channel_username = '@' + channel_username
 
@@ -234,16 +253,13 @@ class TelegramScannerApp:
         await self.deleter.preview_deletions(candidates)
 
         # Удаляем
-        stats = await self.deleter.delete_users(channel_username, candidates)
-        if not stats.get('cancelled'):
-            await self.db_manager.mark_users_as_deleted(
-                [c.user_id for c in candidates],
-                reason=candidates[0].reason.value if candidates else "Deleted Account"
-            )
+        await self.deleter.delete_users(
+            channel_username, candidates, on_deleted=self._mark_users_as_deleted
+        )
 
     async def generate_report_menu(self):
         """Меню генерации отчетов"""
-        channel_username = input("Введите имя канала (или Enter для всех): ").strip()
+        channel_username = (await ainput("Введите имя канала (или Enter для всех): ")).strip()
 
         channel_id = None
         if channel_username:
@@ -256,7 +272,7 @@ class TelegramScannerApp:
         print("3. Текстовый")
         print("4. Все форматы")
 
-        format_choice = input("Ваш выбор: ").strip()
+        format_choice = (await ainput("Ваш выбор: ")).strip()
         format_map = {
             '1': 'csv',
             '2': 'json',
@@ -296,7 +312,7 @@ class TelegramScannerApp:
                 print(f"  {cp.channel_username}: {cp.processed_items}/{cp.total_items} "
                       f"({cp.timestamp[:19]})")
 
-        action = input("\nОчистить старые чекпоинты? (y/n): ").lower()
+        action = (await ainput("\nОчистить старые чекпоинты? (y/n): ")).lower()
         if action == 'y':
             self.checkpoint_manager.clean_old_checkpoints()
             print("Старые чекпоинты удалены")
@@ -306,7 +322,7 @@ class TelegramScannerApp:
         print("\nТекущие настройки:")
         config.print_config()
 
-        if input("\nИзменить настройки? (y/n): ").lower() == 'y':
+        if (await ainput("\nИзменить настройки? (y/n): ")).lower() == 'y':
             print("Для изменения настроек отредактируйте файл .env и перезапустите приложение")
 
     async def cleanup(self):
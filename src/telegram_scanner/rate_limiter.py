@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов к Telegram ("ведро токенов")
+
+    Токены пополняются со скоростью rate в секунду до capacity; каждый запрос
+    забирает один токен. FloodWait от сервера приостанавливает выдачу токенов
+    всем ожидающим сразу, а не только запросу, который получил ошибку.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: float = 1.0):
+        """
+        Args:
+            rate: Запросов в секунду; None - без ограничения частоты
+            capacity: Сколько запросов можно выполнить подряд после простоя
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.pause_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_delay(cls, delay: float, capacity: float = 1.0) -> "TokenBucket":
+        """Создать ограничитель по минимальной паузе между запросами"""
+        return cls(1.0 / delay if delay > 0 else None, capacity)
+
+    async def acquire(self):
+        """Дождаться разрешения на очередной запрос"""
+        # Ожидающие обслуживаются по очереди, в порядке вызова
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.pause_until:
+                    await asyncio.sleep(self.pause_until - now)
+                    continue
+
+                if self.rate is None:
+                    return
+
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Приостановить все запросы на время, указанное сервером (FloodWait)"""
+        self.pause_until = max(self.pause_until, time.monotonic() + seconds)
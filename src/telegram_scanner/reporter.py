@@ -1,14 +1,112 @@
+import asyncio
 import json
 import csv
-from typing import List, Dict, Optional
+from contextlib import ExitStack
+from operator import itemgetter
+from typing import List, Dict, Optional, AsyncIterable, Tuple
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
+import openpyxl
 from tabulate import tabulate
 
 from .database import DatabaseManager
 from .analyzer import DeletionCandidate
 
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него используется стандартный json
+    orjson = None
+
+
+# Колонки CSV удаленных аккаунтов: ключи строк find_deleted_accounts и заголовки
+_DELETED_ACCOUNT_COLUMNS = (
+    ('id', 'ID'),
+    ('access_hash', 'Access Hash'),
+    ('username', 'Username'),
+    ('first_name', 'First Name'),
+    ('last_name', 'Last Name'),
+    ('bot', 'Bot'),
+    ('status', 'Status'),
+    ('last_online', 'Last Online'),
+    ('channel_id', 'Channel ID'),
+    ('channel_username', 'Channel Username'),
+)
+_DELETED_ACCOUNT_HEADER = [title for _, title in _DELETED_ACCOUNT_COLUMNS]
+# Заголовок листа Excel: имена полей, как их раньше выводил DataFrame
+_DELETED_ACCOUNT_KEYS = [key for key, _ in _DELETED_ACCOUNT_COLUMNS]
+_deleted_account_row = itemgetter(*(key for key, _ in _DELETED_ACCOUNT_COLUMNS))
+
+
+# Поля отчета по кандидатам на удаление (колонки CSV и ключи JSON)
+_CANDIDATE_FIELDS = ('id', 'access_hash', 'username', 'first_name', 'last_name', 'reason', 'confidence', 'is_bot')
+_candidate_csv_row = itemgetter(*_CANDIDATE_FIELDS)
+# Сколько кандидатов переводится в словари за раз при записи отчета
+_CANDIDATES_CHUNK_SIZE = 5000
+
+
+def _candidate_row(candidate: DeletionCandidate) -> Dict:
+    """Кандидат на удаление в виде строки отчета"""
+    return {
+        'id': candidate.user_id,
+        'access_hash': candidate.access_hash,
+        'username': candidate.username,
+        'first_name': candidate.first_name,
+        'last_name': candidate.last_name,
+        'reason': candidate.reason.value,
+        'confidence': candidate.confidence,
+        'is_bot': candidate.is_bot
+    }
+
+
+def _json_default(obj):
+    """Сериализация значений, которые json не поддерживает сам"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+def _dumps(data) -> bytes:
+    """JSON с отступом в 2 пробела в UTF-8; orjson, если установлен"""
+    if orjson is not None:
+        # datetime orjson сериализует сам в том же формате, что и isoformat()
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+class _JsonReportWriter:
+    """
+    Потоковая запись JSON отчета {"metadata": ..., "<key>": [...]}
+
+    Строки дописываются пачками; результат совпадает с сериализацией
+    всего отчета целиком, но в памяти держится только текущая пачка.
+    """
+
+    _EMPTY_TAIL = b'[]\n}'
+
+    def __init__(self, f, metadata: Dict, key: str = 'deleted_accounts'):
+        head = _dumps({'metadata': metadata, key: []})
+        self._f = f
+        self._f.write(head[:-len(self._EMPTY_TAIL)] + b'[')
+        self._empty = True
+
+    def write(self, rows: List[Dict]):
+        if not rows:
+            return
+        # Пачка сериализуется как массив; без скобок ее элементы сдвигаются
+        # на уровень вложенности массива
+        body = _dumps(rows)[2:-2]
+        self._f.write((b'\n' if self._empty else b',\n') + b'  ' + body.replace(b'\n', b'\n  '))
+        self._empty = False
+
+    def close(self):
+        self._f.write(self._EMPTY_TAIL[1:] if self._empty else b'\n  ]\n}')
+
+
+async def _no_rows() -> AsyncIterable[List[Dict]]:
+    """Пустой поток пачек (отчет без удаленных аккаунтов)"""
+    return
+    yield
+
 
 class ReportGenerator:
     """Генератор отчетов по результатам сканирования и удаления"""
@@ -43,156 +141,180 @@ class ReportGenerator:
         base_filename = f"report_{channel_username or channel_id}_{timestamp}"
         generated_files = {}
 
-        # Получаем статистику
-        total_users = await self.db.get_total_users_count(channel_id)
-        deletion_stats = await self.db.get_deletion_stats()
+        # Получаем статистику (один запрос)
+        header = await self.db.get_report_header_stats(channel_id)
+        total_users = header['total_users']
+        deletion_stats = header['deletion_stats']
 
-        # Получаем удаленных пользователей
-        deleted_users = []
+        # Удаленные аккаунты читаются из базы пачками за один проход: JSON и CSV
+        # пишутся параллельно, в памяти остаются только первые строки для txt
+        deleted_found = 0
+        chunks = _no_rows()
         if include_deleted:
-            deleted_users = await self.db.find_deleted_accounts(channel_id=channel_id)
-
-        # Формируем отчет
-        report_data = {
-            'metadata': {
-                'generated_at': datetime.now().isoformat(),
-                'channel_id': channel_id,
-                'channel_username': channel_username,
-                'total_users_scanned': total_users,
-                'deleted_accounts_found': len(deleted_users),
-                'deletion_stats': deletion_stats
-            },
-            'deleted_accounts': deleted_users
+            deleted_found = header['deleted_accounts']
+            chunks = self.db.iter_deleted_accounts(channel_id=channel_id)
+
+        metadata = {
+            'generated_at': datetime.now().isoformat(),
+            'channel_id': channel_id,
+            'channel_username': channel_username,
+            'total_users_scanned': total_users,
+            'deleted_accounts_found': deleted_found,
+            'deletion_stats': deletion_stats
         }
 
-        # Экспорт в JSON
-        if export_format in ['json', 'both']:
-            json_path = await self._export_json(report_data, f"{base_filename}.json")
-            generated_files['json'] = str(json_path)
+        # Статистика удалений известна заранее, поэтому ее CSV пишется в потоке
+        # параллельно с проходом по удаленным аккаунтам
+        writes = [self._export_deleted_accounts(
+            chunks, metadata, base_filename,
+            write_json=export_format in ['json', 'both'],
+            write_csv=export_format in ['csv', 'both'] and deleted_found > 0
+        )]
+        if export_format in ['csv', 'both'] and deletion_stats:
+            writes.append(asyncio.to_thread(self._export_deletion_stats_csv, deletion_stats, base_filename))
+        (files, preview), *stats_path = await asyncio.gather(*writes)
+        if 'json' in files:
+            generated_files['json'] = str(files.pop('json'))
 
         # Экспорт в CSV
         if export_format in ['csv', 'both']:
-            csv_paths = await self._export_csv(report_data, base_filename)
-            generated_files['csv'] = csv_paths
+            if stats_path:
+                files['deletion_stats'] = stats_path[0]
+            generated_files['csv'] = files
 
         # Создаем текстовый отчет
+        report_data = {'metadata': metadata, 'deleted_accounts': preview}
         txt_path = await self._export_text_report(report_data, f"{base_filename}.txt")
         generated_files['txt'] = str(txt_path)
 
         return generated_files
 
-    async def _export_json(self, data: Dict, filename: str) -> Path:
-        """Экспорт в JSON формат"""
-        filepath = self.output_dir / filename
-
-        # Конвертируем datetime объекты в строки
-        def datetime_converter(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False, default=datetime_converter)
-
-        return filepath
+    async def _export_deleted_accounts(
+        self,
+        chunks: AsyncIterable[List[Dict]],
+        metadata: Dict,
+        base_filename: str,
+        write_json: bool,
+        write_csv: bool,
+        preview_size: int = 20
+    ) -> Tuple[Dict[str, Path], List[Dict]]:
+        """
+        Записать удаленные аккаунты в JSON и CSV за один проход по пачкам
 
-    async def _export_csv(self, data: Dict, base_filename: str) -> Dict[str, Path]:
-        """Экспорт в CSV формат"""
-        files = {}
-
-        # CSV для удаленных аккаунтов
-        if data.get('deleted_accounts'):
-            deleted_filename = f"{base_filename}_deleted_accounts.csv"
-            deleted_filepath = self.output_dir / deleted_filename
-
-            with open(deleted_filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                # Заголовок
-                writer.writerow([
-                    'ID', 'Access Hash', 'Username', 'First Name', 'Last Name',
-                    'Bot', 'Status', 'Last Online', 'Channel ID', 'Channel Username'
-                ])
-
-                # Данные
-                for user in data['deleted_accounts']:
-                    writer.writerow([
-                        user.get('id', ''),
-                        user.get('access_hash', ''),
-                        user.get('username', ''),
-                        user.get('first_name', ''),
-                        user.get('last_name', ''),
-                        user.get('bot', False),
-                        user.get('status', ''),
-                        user.get('last_online', ''),
-                        user.get('channel_id', ''),
-                        user.get('channel_username', '')
-                    ])
-
-            files['deleted_accounts'] = deleted_filepath
-
-        # CSV для статистики удалений
-        if data['metadata']['deletion_stats']:
-            stats_filename = f"{base_filename}_deletion_stats.csv"
-            stats_filepath = self.output_dir / stats_filename
-
-            stats = data['metadata']['deletion_stats']
-            with open(stats_filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Metric', 'Value'])
-                writer.writerow(['Total Attempts', stats['total']])
-                writer.writerow(['Successful', stats['successful']])
-                writer.writerow(['Failed', stats['failed']])
-                writer.writerow(['With Errors', stats['with_errors']])
-
-            files['deletion_stats'] = stats_filepath
-
-        return files
+        Returns:
+            Пути к созданным файлам и первые preview_size аккаунтов
+        """
+        files: Dict[str, Path] = {}
+        preview: List[Dict] = []
+
+        with ExitStack() as stack:
+            json_writer = None
+            if write_json:
+                files['json'] = self.output_dir / f"{base_filename}.json"
+                json_writer = _JsonReportWriter(stack.enter_context(open(files['json'], 'wb')), metadata)
+
+            csv_writer = None
+            if write_csv:
+                files['deleted_accounts'] = self.output_dir / f"{base_filename}_deleted_accounts.csv"
+                csv_file = stack.enter_context(open(files['deleted_accounts'], 'w', newline='', encoding='utf-8'))
+                csv_writer = csv.writer(csv_file)
+                csv_writer.writerow(_DELETED_ACCOUNT_HEADER)
+
+            def write_rows(rows: List[Dict]):
+                if json_writer is not None:
+                    json_writer.write(rows)
+                if csv_writer is not None:
+                    # Строки формирует writerows на стороне C, без списка на каждую строку
+                    csv_writer.writerows(map(_deleted_account_row, rows))
+
+            # Пачка сериализуется и пишется на диск в потоке, пока из базы
+            # читается следующая; цикл событий при этом не блокируется
+            writing = None
+            try:
+                async for rows in chunks:
+                    if writing is not None:
+                        # shield: при отмене поток все равно дописывает пачку
+                        await asyncio.shield(writing)
+                    writing = asyncio.ensure_future(asyncio.to_thread(write_rows, rows))
+                    if len(preview) < preview_size:
+                        preview.extend(rows[:preview_size - len(preview)])
+                if writing is not None:
+                    await asyncio.shield(writing)
+            finally:
+                # Файлы закрываются только после того, как поток закончил запись
+                if writing is not None and not writing.done():
+                    await asyncio.wait([writing])
+
+            if json_writer is not None:
+                json_writer.close()
+
+        return files, preview
+
+    def _export_deletion_stats_csv(self, stats: Dict, base_filename: str) -> Path:
+        """CSV со статистикой удалений"""
+        stats_filepath = self.output_dir / f"{base_filename}_deletion_stats.csv"
+        with open(stats_filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Metric', 'Value'])
+            writer.writerow(['Total Attempts', stats['total']])
+            writer.writerow(['Successful', stats['successful']])
+            writer.writerow(['Failed', stats['failed']])
+            writer.writerow(['With Errors', stats['with_errors']])
+        return stats_filepath
 
     async def _export_text_report(self, data: Dict, filename: str) -> Path:
         """Создать текстовый отчет"""
         filepath = self.output_dir / filename
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write("ОТЧЕТ ПО АНАЛИЗУ КАНАЛА\n")
-            f.write("="*50 + "\n\n")
-
-            # Метаданные
-            metadata = data['metadata']
-            f.write("Информация:\n")
-            f.write(f"  Канал: {metadata.get('channel_username', 'N/A')} (ID: {metadata.get('channel_id', 'N/A')})\n")
-            f.write(f"  Дата генерации: {metadata['generated_at']}\n")
-            f.write(f"  Всего пользователей просканировано: {metadata['total_users_scanned']:,}\n".replace(',', ' '))
-            f.write(f"  Найдено удаленных аккаунтов: {metadata['deleted_accounts_found']:,}\n".replace(',', ' '))
-            f.write("\n")
-
-            # Статистика удалений
-            stats = metadata['deletion_stats']
-            if stats['total'] > 0:
-                f.write("Статистика удалений:\n")
-                f.write(f"  Всего попыток: {stats['total']}\n")
-                f.write(f"  Успешных удалений: {stats['successful']}\n")
-                f.write(f"  Неудачных попыток: {stats['failed']}\n")
-                f.write(f"  С ошибками: {stats['with_errors']}\n")
-                f.write("\n")
-
-            # Топ-20 удаленных аккаунтов
-            deleted = data.get('deleted_accounts', [])
-            if deleted:
-                f.write("Первые 20 удаленных аккаунтов:\n")
-                f.write("-"*60 + "\n")
-                for i, user in enumerate(deleted[:20], 1):
-                    f.write(f"{i:2d}. ID: {user['id']}\n")
-                    f.write(f"     Имя: {user.get('first_name', '')} {user.get('last_name', '')}\n")
-                    if user.get('username'):
-                        f.write(f"     Username: @{user['username']}\n")
-                    f.write(f"     Бот: {'Да' if user.get('bot') else 'Нет'}\n")
-                    f.write("\n")
-
-                if len(deleted) > 20:
-                    f.write(f"... и еще {len(deleted) - 20} удаленных аккаунтов\n")
+        # Отчет собирается в памяти и записывается одним вызовом в потоке
+        await asyncio.to_thread(filepath.write_text, self._render_text_report(data), encoding='utf-8')
 
         return filepath
 
+    @staticmethod
+    def _render_text_report(data: Dict) -> str:
+        """Текст отчета по данным generate_full_report"""
+        parts = ["ОТЧЕТ ПО АНАЛИЗУ КАНАЛА\n", "="*50 + "\n\n"]
+
+        # Метаданные
+        metadata = data['metadata']
+        parts.append("Информация:\n")
+        parts.append(f"  Канал: {metadata.get('channel_username', 'N/A')} (ID: {metadata.get('channel_id', 'N/A')})\n")
+        parts.append(f"  Дата генерации: {metadata['generated_at']}\n")
+        parts.append(f"  Всего пользователей просканировано: {metadata['total_users_scanned']:,}\n".replace(',', ' '))
+        parts.append(f"  Найдено удаленных аккаунтов: {metadata['deleted_accounts_found']:,}\n".replace(',', ' '))
+        parts.append("\n")
+
+        # Статистика удалений
+        stats = metadata['deletion_stats']
+        if stats['total'] > 0:
+            parts.append("Статистика удалений:\n")
+            parts.append(f"  Всего попыток: {stats['total']}\n")
+            parts.append(f"  Успешных удалений: {stats['successful']}\n")
+            parts.append(f"  Неудачных попыток: {stats['failed']}\n")
+            parts.append(f"  С ошибками: {stats['with_errors']}\n")
+            parts.append("\n")
+
+        # Топ-20 удаленных аккаунтов
+        deleted = data.get('deleted_accounts', [])
+        if deleted:
+            parts.append("Первые 20 удаленных аккаунтов:\n")
+            parts.append("-"*60 + "\n")
+            for i, user in enumerate(deleted[:20], 1):
+                parts.append(f"{i:2d}. ID: {user['id']}\n")
+                parts.append(f"     Имя: {user.get('first_name', '')} {user.get('last_name', '')}\n")
+                if user.get('username'):
+                    parts.append(f"     Username: @{user['username']}\n")
+                parts.append(f"     Бот: {'Да' if user.get('bot') else 'Нет'}\n")
+                parts.append("\n")
+
+            # В data только первые аккаунты, общее число берется из метаданных
+            remaining = metadata['deleted_accounts_found'] - min(len(deleted), 20)
+            if remaining > 0:
+                parts.append(f"... и еще {remaining} удаленных аккаунтов\n")
+
+        return ''.join(parts)
+
     async def generate_candidates_report(
         self,
         candidates: List[DeletionCandidate],
@@ -214,51 +336,33 @@ class ReportGenerator:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"deletion_candidates_{channel_username}_{timestamp}"
 
-        generated_files = {}
-
-        # Конвертируем кандидатов в словари
-        candidates_data = []
-        for candidate in candidates:
-            candidates_data.append({
-                'id': candidate.user_id,
-                'access_hash': candidate.access_hash,
-                'username': candidate.username,
-                'first_name': candidate.first_name,
-                'last_name': candidate.last_name,
-                'reason': candidate.reason.value,
-                'confidence': candidate.confidence,
-                'is_bot': candidate.details.get('bot', False)
-            })
-
-        # Экспорт в CSV
-        csv_filename = f"{filename}.csv"
-        csv_filepath = self.output_dir / csv_filename
-
-        with open(csv_filepath, 'w', newline='', encoding='utf-8') as f:
-            if candidates_data:
-                writer = csv.DictWriter(f, fieldnames=candidates_data[0].keys())
-                writer.writeheader()
-                writer.writerows(candidates_data)
-
-        generated_files['csv'] = str(csv_filepath)
-
-        # Экспорт в JSON
-        json_filename = f"{filename}.json"
-        json_filepath = self.output_dir / json_filename
-
-        with open(json_filepath, 'w', encoding='utf-8') as f:
-            json.dump({
-                'metadata': {
-                    'generated_at': datetime.now().isoformat(),
-                    'channel_username': channel_username,
-                    'total_candidates': len(candidates)
-                },
-                'candidates': candidates_data
-            }, f, indent=2, ensure_ascii=False)
-
-        generated_files['json'] = str(json_filepath)
+        csv_filepath = self.output_dir / f"{filename}.csv"
+        json_filepath = self.output_dir / f"{filename}.json"
+        metadata = {
+            'generated_at': datetime.now().isoformat(),
+            'channel_username': channel_username,
+            'total_candidates': len(candidates)
+        }
 
-        return generated_files
+        # CSV и JSON пишутся за один проход; словари строятся только для
+        # текущей пачки кандидатов, а не для всего списка сразу
+        with open(csv_filepath, 'w', newline='', encoding='utf-8') as csv_file, \
+                open(json_filepath, 'wb') as json_file:
+            csv_writer = None
+            if candidates:
+                csv_writer = csv.writer(csv_file)
+                csv_writer.writerow(_CANDIDATE_FIELDS)
+            json_writer = _JsonReportWriter(json_file, metadata, key='candidates')
+
+            for start in range(0, len(candidates), _CANDIDATES_CHUNK_SIZE):
+                rows = [_candidate_row(c) for c in candidates[start:start + _CANDIDATES_CHUNK_SIZE]]
+                # Кортежи вместо DictWriter: поля известны заранее, поиск по
+                # ключам каждой строки не нужен
+                csv_writer.writerows(map(_candidate_csv_row, rows))
+                json_writer.write(rows)
+            json_writer.close()
+
+        return {'csv': str(csv_filepath), 'json': str(json_filepath)}
 
     async def print_summary_report(self, channel_id: int = None, channel_username: str = None):
         """Вывести краткий отчет в консоль"""
@@ -266,14 +370,14 @@ class ReportGenerator:
         print("СВОДНЫЙ ОТЧЕТ")
         print("="*60)
 
-        # Общая статистика
-        total_users = await self.db.get_total_users_count(channel_id)
-        deleted_users = await self.db.find_deleted_accounts(channel_id=channel_id)
-        deletion_stats = await self.db.get_deletion_stats()
+        # Общая статистика (один запрос, строки аккаунтов не загружаются)
+        header = await self.db.get_report_header_stats(channel_id)
+        deleted_count = header['deleted_accounts']
+        deletion_stats = header['deletion_stats']
 
         print(f"Канал: {channel_username or 'ID: ' + str(channel_id)}")
-        print(f"Всего пользователей в БД: {total_users:,}".replace(',', ' '))
-        print(f"Найдено удаленных аккаунтов: {len(deleted_users):,}".replace(',', ' '))
+        print(f"Всего пользователей в БД: {header['total_users']:,}".replace(',', ' '))
+        print(f"Найдено удаленных аккаунтов: {deleted_count:,}".replace(',', ' '))
 
         if deletion_stats['total'] > 0:
             print(f"\nСтатистика удалений:")
@@ -282,14 +386,11 @@ class ReportGenerator:
             print(f"  Ошибок: {deletion_stats['failed']}")
 
         # Таблица по причинам
-        from collections import defaultdict
-        reason_stats = defaultdict(int)
-        for user in deleted_users:
-            first_name = (user.get('first_name') or '').lower()
-            if first_name.startswith('deleted'):
-                reason_stats['Deleted Account'] += 1
-            else:
-                reason_stats['Other'] += 1
+        reason_stats = {}
+        if header['deleted_named']:
+            reason_stats['Deleted Account'] = header['deleted_named']
+        if deleted_count > header['deleted_named']:
+            reason_stats['Other'] = deleted_count - header['deleted_named']
 
         if reason_stats:
             print(f"\nРаспределение по причинам:")
@@ -319,26 +420,34 @@ class ReportGenerator:
         filename = f"full_report_{channel_username}_{timestamp}.xlsx"
         filepath = self.output_dir / filename
 
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            # Лист с общей статистикой
-            stats = await self.db.get_deletion_stats()
-            total_users = await self.db.get_total_users_count()
-            deleted_users = await self.db.find_deleted_accounts() if include_deleted else []
-
-            stats_df = pd.DataFrame([
-                ['Всего пользователей', total_users],
-                ['Найдено удаленных аккаунтов', len(deleted_users)],
-                ['Всего попыток удаления', stats['total']],
-                ['Успешных удалений', stats['successful']],
-                ['Неудачных попыток', stats['failed']],
-                ['С ошибками', stats['with_errors']]
-            ], columns=['Метрика', 'Значение'])
-
-            stats_df.to_excel(writer, sheet_name='Общая статистика', index=False)
-
-            # Лист с удаленными аккаунтами
-            if include_deleted and deleted_users:
-                deleted_df = pd.DataFrame(deleted_users)
-                deleted_df.to_excel(writer, sheet_name='Удаленные аккаунты', index=False)
+        header = await self.db.get_report_header_stats()
+        stats = header['deletion_stats']
+
+        # Книга в режиме write-only: строки сразу уходят во временный файл,
+        # поэтому память не растет с числом удаленных аккаунтов
+        workbook = openpyxl.Workbook(write_only=True)
+
+        # Лист с общей статистикой
+        stats_sheet = workbook.create_sheet('Общая статистика')
+        stats_sheet.append(['Метрика', 'Значение'])
+        for row in (
+            ['Всего пользователей', header['total_users']],
+            ['Найдено удаленных аккаунтов', header['deleted_accounts'] if include_deleted else 0],
+            ['Всего попыток удаления', stats['total']],
+            ['Успешных удалений', stats['successful']],
+            ['Неудачных попыток', stats['failed']],
+            ['С ошибками', stats['with_errors']],
+        ):
+            stats_sheet.append(row)
+
+        # Лист с удаленными аккаунтами (читаются из базы пачками)
+        if include_deleted and header['deleted_accounts']:
+            deleted_sheet = workbook.create_sheet('Удаленные аккаунты')
+            deleted_sheet.append(_DELETED_ACCOUNT_KEYS)
+            async for rows in self.db.iter_deleted_accounts():
+                for row in map(_deleted_account_row, rows):
+                    deleted_sheet.append(row)
+
+        workbook.save(filepath)
 
         return filepath
@@ -0,0 +1,113 @@
+import unittest
+
+from telegram_scanner.analyzer import DeletedUserAnalyzer, DeletionReason, DetailsFlag
+
+
+def build_row(user_id: int, first_name=None, last_name=None, username=None, bot: bool = False) -> dict:
+    """Создать строку пользователя в формате БД."""
+    return {
+        "id": user_id,
+        "access_hash": user_id * 10 + 1,
+        "username": username,
+        "first_name": first_name,
+        "last_name": last_name,
+        "bot": bot,
+    }
+
+
+class TestDeletedUserAnalyzer(unittest.IsolatedAsyncioTestCase):
+    """Проверка правил классификации пользователей."""
+
+    def setUp(self):
+        self.analyzer = DeletedUserAnalyzer(db_manager=None)
+
+    def test_deleted_account_patterns(self):
+        candidate = self.analyzer._analyze_deleted_account(build_row(1, "Deleted", "Account"))
+        self.assertEqual(candidate.reason, DeletionReason.DELETED_ACCOUNT)
+        self.assertEqual(candidate.confidence, 0.99)
+        self.assertEqual(candidate.details_dict["pattern_matched"], r"deleted\s+account")
+
+        candidate = self.analyzer._analyze_deleted_account(build_row(2, "Deleted", "User", "someone", bot=True))
+        self.assertEqual(candidate.confidence, 0.95)
+        self.assertTrue(candidate.details & DetailsFlag.HAS_USERNAME)
+        self.assertTrue(candidate.is_bot)
+
+        self.assertIsNone(self.analyzer._analyze_deleted_account(build_row(3, None, "Deleted")))
+        self.assertIsNone(self.analyzer._analyze_deleted_account(build_row(4, "Ivan", "Petrov", "ivan")))
+
+    def test_deleted_pattern_follows_rule_order(self):
+        # Самое левое совпадение - "user deleted", но первым в списке правил
+        # стоит "deleted account", и отчет называет именно его
+        for first_name, last_name, pattern in [
+            ("User", "Deleted Account", r"deleted\s+account"),
+            ("Account", "Deleted User", r"deleted\s+user"),
+            ("User Deleted", "Account Deleted", r"deleted\s+account"),
+        ]:
+            candidate = self.analyzer._analyze_deleted_account(build_row(1, first_name, last_name))
+            self.assertEqual(candidate.details_dict["pattern_matched"], pattern)
+
+            batch = self.analyzer._build_deleted_batch([build_row(1, first_name, last_name)])
+            self.assertEqual(batch.patterns, [pattern])
+
+    def test_empty_profile_is_deleted(self):
+        candidate = self.analyzer._analyze_deleted_account(build_row(1))
+        self.assertEqual(candidate.confidence, 0.85)
+        self.assertEqual(candidate.details_dict["pattern_matched"], "empty_profile_as_deleted")
+
+    def test_batch_details_match_list_path(self):
+        rows = [
+            build_row(1, " ", None, "  ", bot=True),
+            build_row(2, "Deleted", "Account", "someone"),
+            build_row(3, "Deleted", "Account"),
+        ]
+        expected = [self.analyzer._analyze_deleted_account(row) for row in rows]
+        candidates = self.analyzer._build_deleted_batch(rows).to_candidates()
+
+        # Username из одних пробелов у пустого профиля не дает флаг HAS_USERNAME
+        self.assertEqual(candidates[0].details, DetailsFlag.IS_BOT)
+        self.assertEqual([c.details for c in candidates], [c.details for c in expected])
+        self.assertEqual([c.details_dict for c in candidates], [c.details_dict for c in expected])
+
+    def test_suspicious_username(self):
+        for username, pattern in [
+            ("user123", r"^user\d+"),
+            ("1234567", r"^\d{5,}$"),
+            ("ab12", r"^[a-z]{1,2}\d+$"),
+            ("_hidden", r"^_\w+$"),
+            ("hidden_", r"^\w+_$"),
+        ]:
+            self.assertEqual(
+                self.analyzer._is_suspicious_username(username),
+                (True, f"Matches pattern: {pattern}", 0.6),
+            )
+        self.assertEqual(self.analyzer._is_suspicious_username("ivan.petrov"), (False, "", 0.0))
+
+    def test_default_profile_handles_missing_fields(self):
+        # Поля из БД приходят как None
+        self.assertEqual(self.analyzer._has_default_profile(build_row(1)), (True, "Empty profile", 0.9))
+        self.assertEqual(self.analyzer._has_default_profile(build_row(2, "User", None, "x")), (False, "", 0.0))
+
+        is_default, reason, confidence = self.analyzer._has_default_profile(build_row(3, "User", "Account"))
+        self.assertTrue(is_default)
+        self.assertEqual(reason, "Default first name: User; Default last name: Account")
+        self.assertEqual(confidence, 0.5)
+
+    async def test_analyze_user_batch(self):
+        users = [
+            build_row(1, "Deleted", "Account"),
+            build_row(2, "Ivan", "Petrov", "user42"),
+            build_row(3, "User", "Account", "fine"),
+            build_row(4, "Ivan", "Petrov", "ivan"),
+        ]
+        candidates = await self.analyzer.analyze_user_batch(users)
+
+        reasons = {(c.user_id, c.reason) for c in candidates}
+        self.assertSetEqual(reasons, {
+            (1, DeletionReason.DELETED_ACCOUNT),
+            (2, DeletionReason.FAKE_PATTERN),
+            (3, DeletionReason.EMPTY_PROFILE),
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
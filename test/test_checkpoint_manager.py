@@ -0,0 +1,165 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from telegram_scanner import checkpoint_manager as checkpoint_module
+from telegram_scanner.checkpoint_manager import CheckpointManager, Checkpoint, channel_key
+
+
+def build_checkpoint(processed: int, channel_id: int = 42, operation_type: str = "delete") -> Checkpoint:
+    """Создать тестовый чекпоинт."""
+    return Checkpoint(
+        operation_type=operation_type,
+        channel_id=channel_id,
+        channel_username="@test",
+        processed_items=processed,
+        total_items=100,
+        metadata={"deleted_count": processed},
+    )
+
+
+class TestCheckpointManager(unittest.TestCase):
+    """Проверка журнала чекпоинтов."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.manager = CheckpointManager(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_latest_checkpoint_roundtrip(self):
+        for processed in (10, 20, 30):
+            self.manager.save_checkpoint(build_checkpoint(processed))
+
+        latest = self.manager.load_latest_checkpoint("delete", 42)
+        self.assertIsNotNone(latest)
+        self.assertEqual(latest.processed_items, 30)
+        self.assertEqual(latest.metadata, {"deleted_count": 30})
+        self.assertIsNone(self.manager.load_latest_checkpoint("export", 42))
+
+    def test_delete_checkpoint_clears_latest(self):
+        self.manager.save_checkpoint(build_checkpoint(10))
+        self.manager.delete_checkpoint("delete", 42)
+
+        self.assertIsNone(self.manager.load_latest_checkpoint("delete", 42))
+
+    def test_clean_old_checkpoints_keeps_last_per_group(self):
+        for processed in range(1, 8):
+            self.manager.save_checkpoint(build_checkpoint(processed))
+        self.manager.save_checkpoint(build_checkpoint(1, channel_id=7))
+
+        self.manager.clean_old_checkpoints(keep_count=3)
+
+        grouped = self.manager.list_checkpoints()
+        channel_42 = [cp.processed_items for cp in grouped["delete"] if cp.channel_id == 42]
+        channel_7 = [cp for cp in grouped["delete"] if cp.channel_id == 7]
+        self.assertEqual(sorted(channel_42), [5, 6, 7])
+        self.assertEqual(len(channel_7), 1)
+        self.assertEqual(self.manager.load_latest_checkpoint("delete", 42).processed_items, 7)
+
+    def test_checkpoint_metas_without_payload(self):
+        self.manager.save_checkpoint(build_checkpoint(10))
+        self.manager.save_checkpoint(build_checkpoint(20, operation_type="export"))
+
+        metas = self.manager.load_all_checkpoint_metas("delete")
+        self.assertEqual(len(metas), 1)
+        operation_type, channel_id, timestamp, _ = metas[0]
+        self.assertEqual((operation_type, channel_id), ("delete", 42))
+        self.assertTrue(timestamp)
+
+    def test_storage_created_on_first_use(self):
+        checkpoints_dir = os.path.join(self.tmpdir.name, "lazy")
+        manager = CheckpointManager(checkpoints_dir)
+        self.assertFalse(os.path.exists(checkpoints_dir))
+
+        self.assertIsNone(manager.load_latest_checkpoint("delete", 42))
+        manager.save_checkpoint(build_checkpoint(10))
+        self.assertEqual(manager.load_latest_checkpoint("delete", 42).processed_items, 10)
+
+    def test_batch_data_roundtrip(self):
+        records = [{"id": 1, "username": "a"}, {"id": 2, "username": None}]
+        path = self.manager.save_batch_data(records, "batch.bin")
+        self.assertEqual(self.manager.load_batch_data("batch.bin"), records)
+        if checkpoint_module.pa is not None:
+            # Однородные записи по-прежнему сохраняются в Arrow
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(6), b"ARROW1")
+
+        arbitrary = {"ids": {1, 2, 3}}
+        self.manager.save_batch_data(arbitrary, "other.bin")
+        self.assertEqual(self.manager.load_batch_data("other.bin"), arbitrary)
+
+    def test_batch_data_roundtrip_mixed_records(self):
+        # Разные ключи, кортежи, вложенные словари и int вперемешку с float
+        # не должны теряться или меняться при сохранении
+        batches = [
+            [{"a": 1}, {"a": None, "b": 2}, {"a": 3, "t": (1, 2)}],
+            [{"a": 1}, {"a": 2.5}],
+            [{"a": {"x": 1}}, {"a": {"y": 2}}],
+            [{"a": 1, "b": 2}, {"b": 3, "a": 4}],
+        ]
+        for number, records in enumerate(batches):
+            filename = f"mixed_{number}.bin"
+            path = self.manager.save_batch_data(records, filename)
+            with open(path, "rb") as f:
+                self.assertNotEqual(f.read(6), b"ARROW1")
+            loaded = self.manager.load_batch_data(filename)
+            self.assertEqual(loaded, records)
+            self.assertEqual([list(row) for row in loaded], [list(row) for row in records])
+            self.assertEqual(
+                [[type(v) for v in row.values()] for row in loaded],
+                [[type(v) for v in row.values()] for row in records],
+            )
+
+    def test_load_all_sees_changes_from_other_manager(self):
+        self.manager.save_checkpoint(build_checkpoint(10))
+        self.assertEqual(len(self.manager.load_all_checkpoints()), 1)
+
+        other = CheckpointManager(self.tmpdir.name)
+        other.save_checkpoint(build_checkpoint(20, operation_type="export"))
+
+        self.assertEqual(len(self.manager.load_all_checkpoints()), 2)
+        self.assertEqual(len(self.manager.load_all_checkpoints("export")), 1)
+
+    def test_channel_key_is_stable_across_processes(self):
+        code = "from telegram_scanner.checkpoint_manager import channel_key; print(channel_key('@Test_Channel'))"
+        keys = set()
+        for seed in ("1", "2"):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+            keys.add(int(output.stdout))
+
+        self.assertEqual(keys, {channel_key("test_channel")})
+
+
+class TestCheckpointManagerAsync(unittest.IsolatedAsyncioTestCase):
+    """Проверка асинхронного сохранения чекпоинтов."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.manager = CheckpointManager(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    async def test_async_saves_are_coalesced(self):
+        ids = await asyncio.gather(
+            self.manager.save_checkpoint_async(build_checkpoint(10)),
+            self.manager.save_checkpoint_async(build_checkpoint(20)),
+            self.manager.save_checkpoint_async(build_checkpoint(5, operation_type="export")),
+        )
+
+        # Чекпоинт delete/42 со значением 10 вытеснен более новым до записи
+        self.assertIsNone(ids[0])
+        self.assertIsNotNone(ids[1])
+        self.assertIsNotNone(ids[2])
+        self.assertEqual(len(self.manager.load_all_checkpoints()), 2)
+        self.assertEqual(self.manager.load_latest_checkpoint("delete", 42).processed_items, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
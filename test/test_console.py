@@ -0,0 +1,64 @@
+import asyncio
+import builtins
+import threading
+import unittest
+
+from telegram_scanner.console import ainput
+
+
+class TestAsyncInput(unittest.IsolatedAsyncioTestCase):
+    """Проверка ввода без блокировки цикла событий."""
+
+    async def asyncSetUp(self):
+        self._input = builtins.input
+        self.release = threading.Event()
+
+    async def asyncTearDown(self):
+        self.release.set()
+        builtins.input = self._input
+
+    async def test_loop_keeps_running_while_waiting_for_input(self):
+        def slow_input(prompt):
+            self.release.wait(5)
+            return f"{prompt}answer"
+
+        builtins.input = slow_input
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                if ticks == 3:
+                    self.release.set()
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        try:
+            self.assertEqual(await ainput("> "), "> answer")
+        finally:
+            task.cancel()
+        self.assertGreaterEqual(ticks, 3)
+
+    async def test_eof_is_raised_in_caller(self):
+        def closed_input(prompt):
+            raise EOFError
+
+        builtins.input = closed_input
+        with self.assertRaises(EOFError):
+            await ainput()
+
+    async def test_cancelled_wait_ignores_late_answer(self):
+        def slow_input(prompt):
+            self.release.wait(5)
+            return "late"
+
+        builtins.input = slow_input
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(ainput(), 0.05)
+        self.release.set()
+        await asyncio.sleep(0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
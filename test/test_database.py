@@ -0,0 +1,278 @@
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from telegram_scanner.database import DatabaseManager, User
+
+
+class TestDatabaseManager(unittest.IsolatedAsyncioTestCase):
+    """Проверка настроек соединения DatabaseManager."""
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / "test.db"
+
+    async def asyncTearDown(self):
+        self.tmpdir.cleanup()
+
+    def _manager(self, **kwargs) -> DatabaseManager:
+        """Создать менеджер; соединение закрывается и при падении теста до close()."""
+        db = DatabaseManager(str(self.db_path), **kwargs)
+        self.addAsyncCleanup(db.close)
+        return db
+
+    async def _journal_mode(self, db: DatabaseManager) -> str:
+        await db.init_database()
+        try:
+            async with db.connection.execute("PRAGMA journal_mode") as cursor:
+                return (await cursor.fetchone())[0]
+        finally:
+            await db.close()
+
+    async def test_wal_enabled_by_default(self):
+        db = self._manager()
+        self.assertEqual(await self._journal_mode(db), "wal")
+        self.assertEqual(db.journal_mode, "wal")
+
+    async def test_wal_can_be_disabled(self):
+        db = self._manager(wal=False)
+        self.assertEqual(await self._journal_mode(db), "delete")
+
+    async def test_bulk_import_pragmas_are_applied(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            values = {}
+            for pragma in ("synchronous", "temp_store", "cache_size", "mmap_size"):
+                async with db.connection.execute(f"PRAGMA {pragma}") as cursor:
+                    values[pragma] = (await cursor.fetchone())[0]
+        finally:
+            await db.close()
+
+        # synchronous=NORMAL (1), temp_store=MEMORY (2)
+        self.assertEqual(values["synchronous"], 1)
+        self.assertEqual(values["temp_store"], 2)
+        self.assertEqual(values["cache_size"], -64000)
+        self.assertEqual(values["mmap_size"], 268435456)
+
+    async def test_report_header_stats_cache_is_reset_by_writes(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            await db.insert_users_batch([
+                User(id=1, access_hash=1, username=None, first_name="Deleted", last_name="Account"),
+            ], channel_id=1, channel_username="@test")
+            first = await db.get_report_header_stats(channel_id=1)
+            self.assertIs(await db.get_report_header_stats(channel_id=1), first)
+
+            await db.log_deletion(1, "", "success")
+            after_write = await db.get_report_header_stats(channel_id=1)
+        finally:
+            await db.close()
+
+        self.assertIsNot(after_write, first)
+        self.assertEqual(after_write["deletion_stats"]["total"], 1)
+
+    async def test_log_deletions_batch_updates_stats(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            await db.log_deletions_batch([
+                (1, "a", "2024-01-01T00:00:00", "success", None),
+                (2, "", "2024-01-01T00:00:01", "error", "FLOOD_WAIT"),
+            ])
+            await db.log_deletion(3, "c", "success")
+
+            stats = await db.get_deletion_stats()
+        finally:
+            await db.close()
+
+        self.assertEqual(stats, {"total": 3, "successful": 2, "failed": 1, "with_errors": 1})
+
+    async def test_deleted_candidates_use_partial_index(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            await db.insert_users_batch([
+                User(id=1, access_hash=1, username=None, first_name="Deleted", last_name="Account"),
+                User(id=2, access_hash=2, username="ivan", first_name="Ivan", last_name="Petrov"),
+                User(id=3, access_hash=3, username=None, first_name=None, last_name=None),
+            ], channel_id=1, channel_username="@test")
+
+            found = await db.find_deleted_accounts(channel_id=1)
+            header = await db.get_report_header_stats(channel_id=1)
+            other_channel = await db.get_report_header_stats(channel_id=2)
+            query, params = db._deleted_accounts_query(channel_id=1)
+            async with db.connection.execute(f"EXPLAIN QUERY PLAN {query}", params) as cursor:
+                plan = " ".join(row[-1] for row in await cursor.fetchall())
+        finally:
+            await db.close()
+
+        self.assertEqual([row["id"] for row in found], [1, 3])
+        self.assertEqual(header["total_users"], 3)
+        self.assertEqual(header["deleted_accounts"], 2)
+        self.assertEqual(header["deleted_named"], 1)
+        self.assertEqual(header["deletion_stats"]["total"], 0)
+        self.assertEqual(other_channel["total_users"], 0)
+        self.assertIn("idx_users_deleted_candidate", plan)
+
+    async def test_upgrade_fills_deleted_candidate_flag(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE users (
+                    id INTEGER PRIMARY KEY, access_hash INTEGER NOT NULL, username TEXT,
+                    first_name TEXT, last_name TEXT, bot BOOLEAN, status TEXT, last_online TEXT,
+                    channel_id INTEGER, channel_username TEXT
+                )
+            """)
+            conn.executemany(
+                "INSERT INTO users (id, access_hash, first_name, last_name) VALUES (?, ?, ?, ?)",
+                [(1, 1, "Deleted", "User"), (2, 2, "Ivan", None)],
+            )
+        conn.close()
+
+        db = self._manager()
+        await db.init_database()
+        try:
+            found = await db.find_deleted_accounts()
+        finally:
+            await db.close()
+
+        self.assertEqual([row["id"] for row in found], [1])
+
+    async def test_ensure_statistics_creates_stat_table(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            await db.insert_users_batch([
+                User(id=1, access_hash=1, username="a", first_name="A", last_name="B"),
+            ], channel_id=1, channel_username="@test")
+            await db.ensure_statistics()
+            async with db.connection.execute("SELECT COUNT(*) FROM sqlite_stat1") as cursor:
+                stats_rows = (await cursor.fetchone())[0]
+        finally:
+            await db.close()
+
+        self.assertGreater(stats_rows, 0)
+
+    async def test_reinsert_updates_user_in_place(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            await db.insert_users_batch([
+                User(id=1, access_hash=1, username="old", first_name="A", last_name="B"),
+            ], channel_id=1, channel_username="@test")
+            async with db.connection.execute("SELECT added_date FROM users WHERE id = 1") as cursor:
+                first_seen = (await cursor.fetchone())[0]
+
+            await db.insert_users_batch([
+                User(id=1, access_hash=2, username=None, first_name="Deleted", last_name="Account"),
+            ], channel_id=1, channel_username="@test")
+            async with db.connection.execute(
+                "SELECT access_hash, username, added_date FROM users WHERE id = 1"
+            ) as cursor:
+                row = await cursor.fetchone()
+            found = await db.find_deleted_accounts()
+        finally:
+            await db.close()
+
+        self.assertEqual(row, (2, None, first_seen))
+        self.assertEqual([user["id"] for user in found], [1])
+
+    async def test_progress_upsert_keeps_created_at(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            await db.update_progress(1, "@test", 10, 100, last_user_id=5)
+            created_at = (await db.get_progress(1))["created_at"]
+            await db.update_progress(1, "@test", 100, 100, status="completed")
+            progress = await db.get_progress(1)
+        finally:
+            await db.close()
+
+        self.assertEqual(progress["created_at"], created_at)
+        self.assertEqual(progress["processed_members"], 100)
+        self.assertEqual(progress["status"], "completed")
+
+    async def test_limit_and_lookup_by_ids(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            await db.insert_users_batch([
+                User(id=i, access_hash=i, username=None, first_name=None, last_name=None)
+                for i in range(1, 6)
+            ], channel_id=1, channel_username="@test")
+
+            limited = await db.find_deleted_accounts(limit=2)
+            by_ids = await db.get_users_by_ids([2, 4, 99])
+        finally:
+            await db.close()
+
+        self.assertEqual([user["id"] for user in limited], [1, 2])
+        self.assertEqual(sorted(user["id"] for user in by_ids), [2, 4])
+
+    async def test_background_writer_flushes_queued_batches(self):
+        db = self._manager()
+        await db.init_database()
+        try:
+            await db.start_writer(max_pending=2)
+            for start in range(0, 50, 10):
+                users = [
+                    User(id=i, access_hash=i, username=None, first_name="A", last_name="B")
+                    for i in range(start, start + 10)
+                ]
+                self.assertEqual(await db.insert_users_batch(users, 1, "@test"), 10)
+            await db.flush_writes()
+            count = await db.get_total_users_count(channel_id=1)
+            await db.stop_writer()
+        finally:
+            await db.close()
+
+        self.assertEqual(count, 50)
+
+
+    async def test_reads_wait_for_uncommitted_transaction(self):
+        db = self._manager()
+        await db.init_database()
+
+        class Abort(Exception):
+            pass
+
+        with self.assertRaises(Abort):
+            async with db._immediate_transaction() as conn:
+                await conn.execute(
+                    "INSERT INTO users (id, access_hash, first_name) VALUES (1, 1, 'Deleted')"
+                )
+                count = asyncio.create_task(db.get_total_users_count())
+                header = asyncio.create_task(db.get_report_header_stats())
+                await asyncio.sleep(0.05)
+                self.assertFalse(count.done())
+                self.assertFalse(header.done())
+                raise Abort()
+
+        # Строка откатилась, и чтения ее не увидели
+        self.assertEqual(await count, 0)
+        self.assertEqual((await header)["total_users"], 0)
+
+    async def test_iter_deleted_accounts_pages_without_holding_lock(self):
+        db = self._manager()
+        await db.init_database()
+        await db.insert_users_batch([
+            User(id=i, access_hash=i, username=None, first_name=None, last_name=None)
+            for i in range(1, 6)
+        ], channel_id=1, channel_username="@test")
+
+        chunks = []
+        async for rows in db.iter_deleted_accounts(channel_id=1, chunk_size=2):
+            chunks.append([row["id"] for row in rows])
+            if len(chunks) == 1:
+                # Запись между пачками не ждет окончания чтения
+                await asyncio.wait_for(db.mark_users_as_deleted([3]), timeout=5)
+
+        self.assertEqual(chunks, [[1, 2], [4, 5]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,23 +9,11 @@ from telegram_scanner.database import DatabaseManager, User
 
 def build_user(user_id: int, deleted: bool, channel_id: int, channel_username: str) -> User:
     """Создать тестового пользователя."""
-    first_name = "Deleted" if deleted else f"User{user_id}"
-    last_name = "Account" if deleted else f"LN{user_id}"
-    username = None if deleted else f"user{user_id}"
-    photo_id = user_id * 100 if not deleted else None
-
-    return User(
-        id=user_id,
-        access_hash=user_id * 10 + 1,
-        username=username,
-        first_name=first_name,
-        last_name=last_name,
-        photo_id=photo_id,
-        bot=False,
-        verified=False,
-        restricted=False,
-        premium=False,
-    )
+    if deleted:
+        return User(user_id, user_id * 10 + 1, None, "Deleted", "Account")
+    # Позиционные аргументы: быстрее именованных на миллионах вызовов,
+    # флаги bot/verified/restricted/premium остаются по умолчанию False
+    return User(user_id, user_id * 10 + 1, f"user{user_id}", f"User{user_id}", f"LN{user_id}", user_id * 100)
 
 
 class TestDatabaseLargeVolumes(unittest.IsolatedAsyncioTestCase):
@@ -35,6 +23,7 @@ class TestDatabaseLargeVolumes(unittest.IsolatedAsyncioTestCase):
         self.tmpdir = tempfile.TemporaryDirectory()
         self.db_path = Path(self.tmpdir.name) / "test.db"
         self.db = DatabaseManager(str(self.db_path))
+        self.addAsyncCleanup(self.db.close)
         await self.db.init_database()
         self.analyzer = DeletedUserAnalyzer(self.db)
         self.channel_id = 123
@@ -0,0 +1,150 @@
+import csv
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from telethon.errors import FloodWaitError
+from telethon.tl import functions
+
+from telegram_scanner.analyzer import DeletionCandidate, DeletionReason, DetailsFlag
+from telegram_scanner.checkpoint_manager import CheckpointManager
+from telegram_scanner.config import config
+from telegram_scanner.database import DatabaseManager
+from telegram_scanner.deleter import TelegramUserDeleter, _write_candidates
+
+
+def build_candidate(user_id: int, username=None) -> DeletionCandidate:
+    """Создать тестового кандидата на удаление."""
+    return DeletionCandidate(
+        user_id=user_id,
+        access_hash=user_id * 10,
+        username=username,
+        first_name="Deleted",
+        last_name="Аккаунт",
+        reason=DeletionReason.DELETED_ACCOUNT,
+        confidence=0.95,
+        details=DetailsFlag.HAS_USERNAME if username else DetailsFlag(0),
+        pattern="^deleted",
+    )
+
+
+class TestCandidatesExport(unittest.TestCase):
+    """Проверка выгрузки кандидатов в файлы."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.candidates = [build_candidate(1, "user1"), build_candidate(2)]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_csv_export(self):
+        path = Path(self.tmpdir.name) / "candidates.csv"
+        _write_candidates(self.candidates, str(path), "csv")
+
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["ID", "Username", "First Name", "Last Name", "Reason", "Confidence"])
+        self.assertEqual(rows[1], ["1", "user1", "Deleted", "Аккаунт", "Deleted Account", "0.95"])
+        self.assertEqual(rows[2][1], "")
+
+    def test_json_export(self):
+        path = Path(self.tmpdir.name) / "candidates.json"
+        _write_candidates(self.candidates, str(path), "json")
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+        self.assertEqual([item["id"] for item in data], [1, 2])
+        self.assertEqual(data[0]["last_name"], "Аккаунт")
+        self.assertEqual(data[0]["details"], self.candidates[0].details_dict)
+
+
+class FloodingClient:
+    """Заглушка клиента: первый запрос по каждому пользователю получает FloodWait."""
+
+    def __init__(self):
+        self.kicked = []
+        self.flooded = set()
+
+    async def kick_participant(self, channel, user_id):
+        if user_id not in self.flooded:
+            self.flooded.add(user_id)
+            raise FloodWaitError(None, capture=0)
+        if user_id == 3:
+            raise ValueError("USER_NOT_PARTICIPANT")
+        self.kicked.append(user_id)
+
+
+class TestDeleteBatch(unittest.IsolatedAsyncioTestCase):
+    """Проверка параллельного удаления пакета."""
+
+    async def asyncSetUp(self):
+        self._old_delete_delay = config.delete_delay
+        config.delete_delay = 0
+        self.client = FloodingClient()
+        self.deleter = TelegramUserDeleter(self.client, db_manager=None)
+
+    async def asyncTearDown(self):
+        config.delete_delay = self._old_delete_delay
+
+    async def test_flood_wait_is_retried(self):
+        batch = [build_candidate(user_id) for user_id in range(1, 6)]
+        await self.deleter._delete_batch(channel=None, batch=batch, batch_index=0)
+
+        self.assertEqual(sorted(self.client.kicked), [1, 2, 4, 5])
+        self.assertEqual(self.deleter.deleted_count, 5)
+        self.assertEqual(self.deleter.error_count, 1)
+        statuses = sorted(row[3] for row in self.deleter._log_buffer)
+        self.assertEqual(statuses, ["error", "success", "success", "success", "success"])
+
+
+
+class ChannelClient(FloodingClient):
+    """Заглушка клиента с каналом, в котором доступна проверка прав."""
+
+    async def get_entity(self, username):
+        return SimpleNamespace(id=1, username=username)
+
+    async def __call__(self, request):
+        if isinstance(request, functions.channels.GetFullChannelRequest):
+            return SimpleNamespace(full_chat=SimpleNamespace(participants_count=0))
+        raise NotImplementedError(f"Unexpected request: {request}")
+
+
+class TestDeleteUsers(unittest.IsolatedAsyncioTestCase):
+    """Проверка передачи удаленных пользователей обработчику по пакетам."""
+
+    async def asyncSetUp(self):
+        self._old = (config.delete_delay, config.delete_confirmation)
+        config.delete_delay = 0
+        config.delete_confirmation = False
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "delete.db"))
+        self.addAsyncCleanup(self.db.close)
+        await self.db.init_database()
+        self.deleter = TelegramUserDeleter(
+            ChannelClient(), self.db, checkpoint_manager=CheckpointManager(str(Path(self.tmpdir.name) / "checkpoints"))
+        )
+
+    async def asyncTearDown(self):
+        config.delete_delay, config.delete_confirmation = self._old
+        await self.db.close()
+        self.tmpdir.cleanup()
+
+    async def test_only_removed_users_are_reported_per_batch(self):
+        reported = []
+
+        async def on_deleted(removed):
+            reported.append(sorted(candidate.user_id for candidate in removed))
+
+        candidates = [build_candidate(user_id) for user_id in range(1, 7)]
+        stats = await self.deleter.delete_users("@test", candidates, batch_size=3, on_deleted=on_deleted)
+
+        # Пользователь 3 уже не в канале и тоже считается удаленным
+        self.assertEqual(stats["deleted"], 6)
+        self.assertEqual(reported, [[1, 2, 3], [4, 5, 6]])
+
+
+if __name__ == "__main__":
+    unittest.main()
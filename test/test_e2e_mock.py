@@ -1,6 +1,7 @@
 import asyncio
 import tempfile
 import unittest
+from collections import Counter
 from types import SimpleNamespace
 from pathlib import Path
 
@@ -44,6 +45,8 @@ class FakeClient:
         self.channel_id = channel_id
         self.channel_username = channel_username
         self.kicked = []
+        # Число обращений по типу запроса: тест ловит повторные запросы к каналу
+        self.call_counts = Counter()
 
     async def connect(self):
         return True
@@ -55,9 +58,11 @@ class FakeClient:
         return True
 
     async def get_entity(self, username):
+        self.call_counts["get_entity"] += 1
         return SimpleNamespace(id=self.channel_id, title=username, username=username)
 
     async def __call__(self, request):
+        self.call_counts[type(request).__name__] += 1
         # Количество участников
         if isinstance(request, functions.channels.GetFullChannelRequest):
             return SimpleNamespace(full_chat=SimpleNamespace(participants_count=len(self.users)))
@@ -99,12 +104,15 @@ class TestE2EMock(unittest.IsolatedAsyncioTestCase):
 
         # DB и менеджеры
         self.db = DatabaseManager(str(self.db_path))
+        # Закрывает поток соединения aiosqlite, даже если настройка теста упадет дальше
+        self.addAsyncCleanup(self.db.close)
         await self.db.init_database()
         self.exporter = TelegramExporter(self.fake_client, self.db)
         self.analyzer = DeletedUserAnalyzer(self.db)
-        self.deleter = TelegramUserDeleter(self.fake_client, self.db)
         # Изолируем чекпоинты
-        self.deleter.checkpoint_manager = CheckpointManager(str(self.checkpoints_dir))
+        self.deleter = TelegramUserDeleter(
+            self.fake_client, self.db, checkpoint_manager=CheckpointManager(str(self.checkpoints_dir))
+        )
 
         # Убираем подтверждение удаления
         self._old_delete_confirmation = config.delete_confirmation
@@ -120,6 +128,9 @@ class TestE2EMock(unittest.IsolatedAsyncioTestCase):
         stats = await self.exporter.export_channel_participants(self.channel_username)
         self.assertEqual(stats["exported"], len(self.fake_client.users))
         self.assertEqual(stats["channel_id"], self.channel_id)
+        # Канал и число участников запрашиваются один раз на всю выгрузку
+        self.assertEqual(self.fake_client.call_counts["get_entity"], 1)
+        self.assertEqual(self.fake_client.call_counts["GetFullChannelRequest"], 1)
 
         # Анализ
         candidates = await self.analyzer.find_deleted_accounts(channel_id=self.channel_id)
@@ -129,20 +140,40 @@ class TestE2EMock(unittest.IsolatedAsyncioTestCase):
         # Удаление (без подтверждений)
         delete_stats = await self.deleter.delete_users(self.channel_username, candidates)
         self.assertFalse(delete_stats.get("cancelled"))
+        # Удаление добавляет одно разрешение канала и одну проверку прав
+        self.assertEqual(self.fake_client.call_counts["get_entity"], 2)
+        self.assertEqual(self.fake_client.call_counts["GetFullChannelRequest"], 2)
         # Перенос в deleted_users
         await self.db.mark_users_as_deleted([c.user_id for c in candidates])
 
-        total_left = await self.db.get_total_users_count(channel_id=self.channel_id)
+        # Оставшиеся участники и перенесенные записи - одним запросом через
+        # соединение менеджера, без открытия второго соединения
+        async with self.db.connection.execute(
+            "SELECT (SELECT COUNT(*) FROM users WHERE channel_id = ?),"
+            " (SELECT COUNT(*) FROM deleted_users WHERE id IN (3, 4))",
+            (self.channel_id,),
+        ) as cursor:
+            total_left, count_deleted = await cursor.fetchone()
         self.assertEqual(total_left, len(self.fake_client.users) - len(deleted_ids))
-
-        # Проверяем что записи перенесены
-        import aiosqlite
-
-        async with aiosqlite.connect(self.db.db_name) as conn:
-            cur = await conn.execute("SELECT COUNT(*) FROM deleted_users WHERE id IN (3,4)")
-            count_deleted = (await cur.fetchone())[0]
         self.assertEqual(count_deleted, len(deleted_ids))
 
+    async def test_exporter_reused_for_second_export(self):
+        # main.initialize создает один экспортер на всю сессию меню
+        first = await self.exporter.export_channel_participants(self.channel_username)
+        # Очищаем выгруженных: вторая выгрузка должна заново прочитать всех с начала
+        await self.db.connection.execute("DELETE FROM users")
+        await self.db.connection.commit()
+        second = await self.exporter.export_channel_participants(self.channel_username)
+
+        self.assertEqual(first["exported"], len(self.fake_client.users))
+        self.assertEqual(second["exported"], len(self.fake_client.users))
+        async with self.db.connection.execute("SELECT COUNT(*) FROM users") as cursor:
+            (saved,) = await cursor.fetchone()
+        self.assertEqual(saved, len(self.fake_client.users))
+        progress = await self.db.get_progress(self.channel_id)
+        self.assertEqual(progress["status"], "completed")
+        self.assertEqual(progress["processed_members"], len(self.fake_client.users))
+
 
 if __name__ == "__main__":
     asyncio.run(unittest.main())
@@ -0,0 +1,231 @@
+import asyncio
+import random
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+from telethon.tl import functions, types
+
+from telegram_scanner import exporter as exporter_module
+from telegram_scanner.config import config
+from telegram_scanner.database import DatabaseManager
+from telegram_scanner.exporter import TelegramExporter
+
+
+def build_user(user_id: int) -> SimpleNamespace:
+    """Создать заглушку пользователя Telethon."""
+    return SimpleNamespace(
+        id=user_id, access_hash=user_id, username=f"user{user_id}", first_name="Name", last_name="Last",
+        photo=None, bot=False, verified=False, restricted=False, premium=False, status=None,
+    )
+
+
+class PagingClient:
+    """Заглушка клиента, отвечающая на страницы участников с разной задержкой."""
+
+    def __init__(self, total: int):
+        self.users = [build_user(i) for i in range(1, total + 1)]
+        self.offsets = []
+        self.entity_requests = 0
+        self.full_channel_requests = 0
+
+    async def get_entity(self, username):
+        self.entity_requests += 1
+        return SimpleNamespace(id=1, title=username, username=username)
+
+    async def __call__(self, request):
+        if isinstance(request, functions.channels.GetFullChannelRequest):
+            self.full_channel_requests += 1
+            return SimpleNamespace(full_chat=SimpleNamespace(participants_count=len(self.users)))
+        if not isinstance(request, functions.channels.GetParticipantsRequest):
+            raise NotImplementedError(f"Unexpected request: {request}")
+        self.offsets.append(request.offset)
+        await asyncio.sleep(random.uniform(0, 0.01))
+        return SimpleNamespace(users=self.users[request.offset:request.offset + request.limit])
+
+
+class TestParticipantsFetch(unittest.IsolatedAsyncioTestCase):
+    """Проверка параллельной загрузки страниц участников."""
+
+    async def asyncSetUp(self):
+        self._old_request_delay = config.request_delay
+        config.request_delay = 0
+        self.client = PagingClient(total=1050)
+        self.exporter = TelegramExporter(self.client, db_manager=None)
+
+    async def asyncTearDown(self):
+        config.request_delay = self._old_request_delay
+
+    async def collect(self, **kwargs):
+        batches = []
+        async for batch in self.exporter._get_participants_batch(SimpleNamespace(id=1), **kwargs):
+            batches.append([user.id for user in batch])
+        return batches
+
+    async def test_pages_are_yielded_in_order(self):
+        batches = await self.collect()
+
+        self.assertEqual([user_id for batch in batches for user_id in batch], list(range(1, 1051)))
+        self.assertEqual(len(batches[-1]), 50)
+
+    async def test_resume_starts_from_server_offset(self):
+        batches = await self.collect(start_offset=800)
+
+        self.assertEqual([user_id for batch in batches for user_id in batch], list(range(801, 1051)))
+        self.assertNotIn(0, self.client.offsets)
+
+
+class TestUserConversion(unittest.TestCase):
+    """Проверка преобразования пользователя Telethon в User."""
+
+    def test_fields_are_mapped_by_position(self):
+        was_online = datetime(2024, 1, 2, 3, 4, 5)
+        tl_user = SimpleNamespace(
+            id=7, access_hash=70, username="name", first_name="First", last_name="Last",
+            photo=SimpleNamespace(photo_id=700), bot=True, verified=False, restricted=True, premium=True,
+            status=types.UserStatusOffline(was_online=was_online),
+        )
+
+        user = TelegramExporter._to_user(tl_user)
+
+        self.assertEqual(
+            (user.id, user.access_hash, user.username, user.first_name, user.last_name, user.photo_id),
+            (7, 70, "name", "First", "Last", 700),
+        )
+        self.assertEqual((user.bot, user.verified, user.restricted, user.premium), (True, False, True, True))
+        self.assertEqual((user.status, user.last_online), ("offline", was_online))
+        self.assertIsNone(user.added_date)
+
+
+class TestChannelLookupCache(unittest.IsolatedAsyncioTestCase):
+    """Проверка кэширования сущности канала и числа участников."""
+
+    async def test_repeated_lookups_hit_cache(self):
+        client = PagingClient(total=10)
+        exporter = TelegramExporter(client, db_manager=None)
+
+        first = await exporter.get_channel_info("@Test")
+        second = await exporter.get_channel_info("test")
+        self.assertIs(first, second)
+        self.assertEqual(client.entity_requests, 1)
+
+        self.assertEqual(await exporter.get_total_members_count(first), 10)
+        self.assertEqual(await exporter.get_total_members_count(first), 10)
+        self.assertEqual(client.full_channel_requests, 1)
+
+    async def test_members_count_expires(self):
+        client = PagingClient(total=10)
+        exporter = TelegramExporter(client, db_manager=None)
+        channel = await exporter.get_channel_info("@test")
+        await exporter.get_total_members_count(channel)
+
+        timestamp, count = exporter._count_cache[channel.id]
+        exporter._count_cache[channel.id] = (timestamp - 3600, count)
+        await exporter.get_total_members_count(channel)
+
+        self.assertEqual(client.full_channel_requests, 2)
+
+
+class FailingClient(PagingClient):
+    """Заглушка клиента, у которой первые запросы страниц завершаются ошибкой."""
+
+    def __init__(self, total: int, failures: int):
+        super().__init__(total)
+        self.failures = failures
+
+    async def __call__(self, request):
+        if isinstance(request, functions.channels.GetParticipantsRequest) and self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("connection lost")
+        return await super().__call__(request)
+
+
+class TestFetchRetry(unittest.IsolatedAsyncioTestCase):
+    """Проверка повторов запроса страницы с нарастающей паузой."""
+
+    async def asyncSetUp(self):
+        self._old = (config.request_delay, exporter_module._RETRY_BASE_DELAY)
+        config.request_delay = 0
+        exporter_module._RETRY_BASE_DELAY = 0
+
+    async def asyncTearDown(self):
+        config.request_delay, exporter_module._RETRY_BASE_DELAY = self._old
+
+    def test_backoff_grows_and_is_capped(self):
+        exporter_module._RETRY_BASE_DELAY = 1.0
+        delays = [exporter_module._backoff_delay(attempt) for attempt in range(8)]
+
+        for attempt, delay in enumerate(delays[:5]):
+            self.assertGreaterEqual(delay, 2 ** attempt)
+            self.assertLess(delay, 2 ** attempt + 1)
+        self.assertEqual(delays[-1], exporter_module._RETRY_MAX_DELAY)
+
+    async def test_transient_errors_are_retried(self):
+        client = FailingClient(total=10, failures=2)
+        exporter = TelegramExporter(client, db_manager=None)
+
+        users = await exporter._fetch_participants_page(SimpleNamespace(id=1), 0, 200)
+
+        self.assertEqual(len(users), 10)
+        self.assertEqual(exporter.error_count, 2)
+
+    async def test_persistent_errors_stop_fetching(self):
+        client = FailingClient(total=10, failures=100)
+        exporter = TelegramExporter(client, db_manager=None)
+
+        with self.assertRaises(ConnectionError):
+            await exporter._fetch_participants_page(SimpleNamespace(id=1), 0, 200)
+        self.assertEqual(exporter.error_count, exporter_module._FETCH_MAX_FAILURES)
+
+
+class TestExportPipeline(unittest.IsolatedAsyncioTestCase):
+    """Проверка выгрузки с накоплением страниц перед записью."""
+
+    async def asyncSetUp(self):
+        self._old = (config.request_delay, config.batch_size, config.checkpoint_interval)
+        config.request_delay = 0
+        config.batch_size = 400
+        config.checkpoint_interval = 600
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "export.db"))
+        self.addAsyncCleanup(self.db.close)
+        await self.db.init_database()
+        self.exporter = TelegramExporter(PagingClient(total=1050), self.db)
+
+    async def asyncTearDown(self):
+        config.request_delay, config.batch_size, config.checkpoint_interval = self._old
+        await self.db.close()
+        self.tmpdir.cleanup()
+
+    async def test_export_saves_all_users_and_progress(self):
+        stats = await self.exporter.export_channel_participants("@test")
+
+        self.assertEqual(stats["exported"], 1050)
+        self.assertEqual(await self.db.get_total_users_count(channel_id=1), 1050)
+        progress = await self.db.get_progress(1)
+        self.assertEqual(progress["status"], "completed")
+        self.assertEqual(progress["processed_members"], 1050)
+
+    async def test_intermediate_progress_matches_written_users(self):
+        saved = []
+        update_progress = self.db.update_progress
+
+        async def record_progress(channel_id, channel_username, processed, total, last_user_id=None, **kwargs):
+            if last_user_id is not None:
+                # Пользователи к этому моменту уже должны быть в базе
+                saved.append((processed, last_user_id, await self.db.get_total_users_count(channel_id=1)))
+            await update_progress(channel_id, channel_username, processed, total, last_user_id, **kwargs)
+
+        self.db.update_progress = record_progress
+        await self.exporter.export_channel_participants("@test")
+
+        self.assertTrue(saved)
+        for processed, last_user_id, written in saved:
+            self.assertEqual(last_user_id, processed)
+            self.assertGreaterEqual(written, processed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import asyncio
+import time
+import unittest
+
+from telegram_scanner.rate_limiter import TokenBucket
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    """Проверка ограничителя частоты запросов."""
+
+    async def test_rate_is_enforced_for_concurrent_callers(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+
+        # Первый токен доступен сразу, остальные пять - по 10 мс каждый
+        self.assertGreaterEqual(time.monotonic() - started, 0.045)
+
+    async def test_pause_blocks_all_callers(self):
+        bucket = TokenBucket.from_delay(0)
+        bucket.pause(0.05)
+        started = time.monotonic()
+        await asyncio.gather(bucket.acquire(), bucket.acquire())
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.045)
+
+    async def test_zero_delay_means_unlimited(self):
+        bucket = TokenBucket.from_delay(0)
+        started = time.monotonic()
+        for _ in range(1000):
+            await bucket.acquire()
+
+        self.assertIsNone(bucket.rate)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import asyncio
+import csv
+import json
+import tempfile
+import unittest
+from datetime import datetime
+
+import openpyxl
+
+from telegram_scanner import reporter as reporter_module
+from telegram_scanner.analyzer import DeletionCandidate, DeletionReason
+from telegram_scanner.reporter import ReportGenerator
+
+
+def build_row(user_id: int) -> dict:
+    """Строка в формате find_deleted_accounts."""
+    return {
+        'id': user_id, 'access_hash': user_id * 10, 'username': None, 'first_name': 'Deleted',
+        'last_name': 'Account', 'bot': 0, 'status': 'unknown', 'last_online': None,
+        'channel_id': 1, 'channel_username': '@test',
+    }
+
+
+class ChunkedDb:
+    """Заглушка базы, отдающая удаленные аккаунты пачками по два."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def get_report_header_stats(self, channel_id=None):
+        return {
+            "total_users": 100,
+            "deleted_accounts": len(self.rows),
+            "deleted_named": len(self.rows),
+            "deletion_stats": {"total": 1, "successful": 1, "failed": 0, "with_errors": 0},
+        }
+
+    async def iter_deleted_accounts(self, channel_id=None):
+        for start in range(0, len(self.rows), 2):
+            yield self.rows[start:start + 2]
+
+
+class TestFullReport(unittest.TestCase):
+    """Проверка полного отчета, записываемого потоково."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._orjson = reporter_module.orjson
+        self.rows = [build_row(user_id) for user_id in range(1, 6)]
+        self.rows[0]['last_online'] = datetime(2024, 1, 2, 3, 4, 5)
+        self.rows[1]['first_name'] = 'Удален'
+
+    def tearDown(self):
+        reporter_module.orjson = self._orjson
+        self.tmpdir.cleanup()
+
+    def generate(self, rows, export_format="both"):
+        reporter = ReportGenerator(ChunkedDb(rows), output_dir=self.tmpdir.name)
+        return asyncio.run(reporter.generate_full_report(channel_id=1, channel_username="@test", export_format=export_format))
+
+    def assert_json_matches_whole_document(self, rows):
+        files = self.generate(rows, export_format="json")
+
+        with open(files['json'], 'rb') as f:
+            streamed = f.read()
+        report = json.loads(streamed)
+        self.assertEqual(report['metadata']['deleted_accounts_found'], len(rows))
+        # Потоковая запись дает тот же документ, что и сериализация целиком
+        expected = dict(report, deleted_accounts=rows)
+        self.assertEqual(streamed, reporter_module._dumps(expected))
+
+    def test_streamed_json_matches_whole_document(self):
+        for module in (None, self._orjson):
+            if module is None and self._orjson is None:
+                continue
+            reporter_module.orjson = module
+            with self.subTest(orjson=module is not None):
+                self.assert_json_matches_whole_document(self.rows)
+                self.assert_json_matches_whole_document(self.rows[:1])
+                self.assert_json_matches_whole_document([])
+
+    def test_deleted_accounts_csv(self):
+        files = self.generate(self.rows, export_format="csv")
+
+        with open(files['csv']['deleted_accounts'], newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][:3], ['ID', 'Access Hash', 'Username'])
+        self.assertEqual(rows[3], ['3', '30', '', 'Deleted', 'Account', '0', 'unknown', '', '1', '@test'])
+        self.assertEqual(len(rows), 6)
+        self.assertIn('deletion_stats', files['csv'])
+        self.assertNotIn('json', files)
+
+    def test_no_deleted_accounts(self):
+        files = self.generate([])
+
+        self.assertNotIn('deleted_accounts', files['csv'])
+        with open(files['json'], encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['deleted_accounts'], [])
+
+
+class TestTextReport(unittest.TestCase):
+    """Проверка текстового отчета."""
+
+    def test_render_lists_first_accounts(self):
+        rows = [dict(build_row(user_id), username=f"user{user_id}") for user_id in range(1, 23)]
+        data = {
+            'metadata': {
+                'channel_username': '@test', 'channel_id': 1, 'generated_at': '2024-01-01T00:00:00',
+                'total_users_scanned': 12345, 'deleted_accounts_found': len(rows),
+                'deletion_stats': {'total': 0},
+            },
+            'deleted_accounts': rows,
+        }
+
+        text = ReportGenerator._render_text_report(data)
+
+        self.assertIn("Всего пользователей просканировано: 12 345\n", text)
+        self.assertIn(" 1. ID: 1\n     Имя: Deleted Account\n     Username: @user1\n     Бот: Нет\n", text)
+        self.assertNotIn("ID: 21\n", text)
+        self.assertTrue(text.endswith("... и еще 2 удаленных аккаунтов\n"))
+        self.assertNotIn("Статистика удалений", text)
+
+
+class TestExcelExport(unittest.TestCase):
+    """Проверка выгрузки в Excel в режиме write-only."""
+
+    def test_sheets_are_written_from_chunks(self):
+        rows = [build_row(user_id) for user_id in range(1, 6)]
+        rows[0]['last_online'] = datetime(2024, 1, 2, 3, 4, 5)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            reporter = ReportGenerator(ChunkedDb(rows), output_dir=tmpdir)
+            path = asyncio.run(reporter.export_to_excel("@test"))
+
+            workbook = openpyxl.load_workbook(path, read_only=True)
+            stats = list(workbook['Общая статистика'].values)
+            deleted = list(workbook['Удаленные аккаунты'].values)
+            workbook.close()
+
+        self.assertEqual(stats[0], ('Метрика', 'Значение'))
+        self.assertIn(('Всего пользователей', 100), stats)
+        self.assertIn(('Найдено удаленных аккаунтов', 5), stats)
+        self.assertEqual(deleted[0], tuple(rows[0]))
+        self.assertEqual([row[0] for row in deleted[1:]], [1, 2, 3, 4, 5])
+        self.assertEqual(deleted[1][7], datetime(2024, 1, 2, 3, 4, 5))
+
+    def test_deleted_sheet_skipped_without_accounts(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            reporter = ReportGenerator(ChunkedDb([]), output_dir=tmpdir)
+            path = asyncio.run(reporter.export_to_excel("@test"))
+
+            workbook = openpyxl.load_workbook(path, read_only=True)
+            sheets = workbook.sheetnames
+            workbook.close()
+
+        self.assertEqual(sheets, ['Общая статистика'])
+
+
+class TestCandidatesReport(unittest.TestCase):
+    """Проверка отчета по кандидатам, записываемого пачками."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._chunk_size = reporter_module._CANDIDATES_CHUNK_SIZE
+        reporter_module._CANDIDATES_CHUNK_SIZE = 2
+
+    def tearDown(self):
+        reporter_module._CANDIDATES_CHUNK_SIZE = self._chunk_size
+        self.tmpdir.cleanup()
+
+    def generate(self, candidates):
+        reporter = ReportGenerator(None, output_dir=self.tmpdir.name)
+        return asyncio.run(reporter.generate_candidates_report(candidates, "@test", filename="candidates"))
+
+    def test_candidates_written_across_chunks(self):
+        candidates = [
+            DeletionCandidate(user_id, user_id * 10, None, 'Удален', 'Account', DeletionReason.DELETED_ACCOUNT, 1.0)
+            for user_id in range(1, 6)
+        ]
+        files = self.generate(candidates)
+
+        with open(files['json'], encoding='utf-8') as f:
+            data = json.load(f)
+        with open(files['csv'], newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+
+        self.assertEqual(data['metadata']['total_candidates'], 5)
+        self.assertEqual([c['id'] for c in data['candidates']], [1, 2, 3, 4, 5])
+        self.assertEqual(data['candidates'][0]['reason'], 'Deleted Account')
+        self.assertEqual(list(data['candidates'][0]), list(rows[0]))
+        self.assertEqual([row['id'] for row in rows], ['1', '2', '3', '4', '5'])
+
+    def test_empty_candidates(self):
+        files = self.generate([])
+
+        with open(files['json'], encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['candidates'], [])
+        with open(files['csv'], encoding='utf-8') as f:
+            self.assertEqual(f.read(), '')
+
+
+if __name__ == "__main__":
+    unittest.main()